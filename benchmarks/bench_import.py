@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+"""Import time benchmark
+
+Imports fizzpy in fresh interpreters and reports the median wall time.
+Exits non-zero if the import pulls in Tensorflow, matplotlib, SciPy,
+Numba or SymPy, or if the median exceeds the time budget, so it can gate
+CI.
+
+    python benchmarks/bench_import.py --repeat 10 --budget 0.5
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+
+HEAVY_MODULES = ['tensorflow', 'matplotlib', 'scipy', 'numba', 'sympy']
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import fizzpy, fizzpy.core, fizzpy.helpers, fizzpy.symbolic
+elapsed = time.perf_counter() - start
+print(json.dumps({'seconds': elapsed, 'loaded': [m for m in %r if m in sys.modules]}))
+""" % HEAVY_MODULES
+
+
+def measure(repeat):
+    """Run the import probe repeat times, each in a fresh interpreter."""
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', PROBE], check=True, stdout=subprocess.PIPE)
+        runs.append(json.loads(output.stdout.decode()))
+    return runs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=0.5, help='median import time budget in seconds')
+    args = parser.parse_args(argv)
+
+    runs = measure(args.repeat)
+    seconds = [run['seconds'] for run in runs]
+    loaded = sorted({module for run in runs for module in run['loaded']})
+    report = {'benchmark': 'import', 'median_seconds': statistics.median(seconds),
+              'min_seconds': min(seconds), 'max_seconds': max(seconds), 'heavy_modules_loaded': loaded}
+    print(json.dumps(report, indent=2))
+
+    if loaded:
+        print('import fizzpy loaded heavy modules: %s' % ', '.join(loaded), file=sys.stderr)
+        return 1
+    if report['median_seconds'] > args.budget:
+        print('import fizzpy took %.3fs, over the %.3fs budget' % (report['median_seconds'], args.budget),
+              file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
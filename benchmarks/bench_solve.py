@@ -0,0 +1,285 @@
+#!/usr/bin/env python
+"""Solve benchmark
+
+Times every fizzpy.core model with every backend and solver, over a
+range of time_steps and batch sizes, and writes the results as JSON so runs
+from different commits can be compared.
+
+For each case it reports the cold latency (first solve in a fresh
+interpreter, including graph compilation for Tensorflow), the warm latency
+(median of repeated solves), RHS evaluations per second and the peak
+memory traced during a solve. A scaling section fits the exponent of the
+warm latency against time_steps and against batch size. Exits non-zero if
+a numba kernel does not match its model's equations.
+
+    python benchmarks/bench_solve.py --steps 1000 10000 --batch 1 16 --output bench.json
+    python benchmarks/bench_solve.py --output new.json --compare bench.json --tolerance 0.2
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from fizzpy import core
+
+
+SOLVERS = ['odeint', 'dopri5', 'rosenbrock', 'radau']
+
+JIT_SOLVERS = ['euler', 'rk2', 'rk4']
+
+KEY = ('model', 'backend', 'solver', 'time_steps', 'batch')
+
+COLD_PROBE = """
+import json, sys, time
+sys.path.insert(0, %r)
+import bench_solve
+case = json.loads(sys.argv[1])
+model, run = bench_solve.setup(**case)
+start = time.perf_counter()
+run()
+print(json.dumps({'seconds': time.perf_counter() - start}))
+""" % os.path.dirname(os.path.abspath(__file__))
+
+
+def models() -> dict:
+    """Every Model subclass in fizzpy.core, by class name."""
+    return {model.__name__: model for model in core.Model.__subclasses__() if model.__module__ == core.__name__}
+
+
+def available(module: str) -> bool:
+    try:
+        __import__(module)
+    except ImportError:
+        return False
+    return True
+
+
+def configurations(backends: list, solvers: list) -> list:
+    """(backend, solver) pairs, Tensorflow always uses its own odeint."""
+    pairs = []
+    for backend in backends:
+        if backend == 'tensorflow':
+            pairs.append((backend, None))
+        elif backend == 'numba':
+            pairs.extend((backend, solver) for solver in solvers if solver in JIT_SOLVERS)
+        else:
+            pairs.extend((backend, solver) for solver in solvers if solver in SOLVERS)
+    return pairs
+
+
+def setup(model, backend, solver, time_steps, batch):
+    """Build the model for a case and a callable that solves it once."""
+    instance = models()[model]()
+    instance.time_steps = time_steps
+    instance.backend = backend
+    if batch == 1:
+        def run():
+            return instance.solve(backend=backend, solver=solver)
+    else:
+        init_states = np.tile(instance.initial_conditions, (batch, 1))
+        # Spread the initial conditions so the batch is not batch copies of one trajectory
+        init_states = init_states * np.linspace(0.9, 1.1, batch)[:, None]
+
+        def run():
+            return instance.solve_batch(init_states, backend=backend, solver=solver)
+    return instance, run
+
+
+def count_calls(instance) -> list:
+    """Wrap the instance's equations so every evaluation is counted, returns the counter."""
+    counter = [0]
+    equations = instance.equations
+
+    def counted(*args):
+        counter[0] += 1
+        return equations(*args)
+    instance.equations = counted
+    return counter
+
+
+def kernel_error(instance) -> float:
+    """Largest difference between the numba kernel of instance and its equations, at its initial conditions."""
+    from fizzpy import jit
+    from fizzpy.backends import NumpyOps
+
+    y = np.asarray(instance.initial_conditions, dtype=np.float64)
+    p = np.asarray(instance.model_parameters, dtype=np.float64)
+    expected = np.asarray(instance.equations(y, 0., p, NumpyOps), dtype=np.float64)
+    dy = np.empty_like(y)
+    jit.rhs(jit.kernel(instance), y, 0., p, dy)
+    return float(np.abs(dy - expected).max() / max(np.abs(expected).max(), 1.))
+
+
+def cold_latency(case: dict) -> float:
+    """Seconds taken by the first solve of a case in a fresh interpreter, after imports."""
+    output = subprocess.run([sys.executable, '-c', COLD_PROBE, json.dumps(case)], check=True,
+                            stdout=subprocess.PIPE)
+    return json.loads(output.stdout.decode().splitlines()[-1])['seconds']
+
+
+def measure(case: dict, repeat: int, cold: bool) -> dict:
+    """Benchmark one case."""
+    result = dict(case)
+    instance, run = setup(**case)
+    counter = count_calls(instance)
+    run()
+    calls = counter[0]
+
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        seconds.append(time.perf_counter() - start)
+    warm = statistics.median(seconds)
+
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    result.update(warm_median_seconds=warm, warm_min_seconds=min(seconds), peak_memory_bytes=peak)
+    # The Tensorflow graph calls the equations once, while building it, and
+    # the numba backend calls its compiled copy of them, counted in its stats
+    if case['backend'] == 'numpy':
+        result.update(rhs_calls=calls, rhs_evals_per_second=calls * case['batch'] / warm)
+    elif case['backend'] == 'numba':
+        calls = instance.stats.nfev
+        result.update(rhs_calls=calls, rhs_evals_per_second=calls * case['batch'] / warm,
+                      kernel_error=kernel_error(instance))
+    else:
+        result.update(rhs_calls=None, rhs_evals_per_second=None)
+    result['cold_seconds'] = cold_latency(case) if cold else None
+    return result
+
+
+def fit_exponent(sizes: list, seconds: list) -> float:
+    """Slope of log(seconds) against log(size), 1 for linear scaling."""
+    if len(set(sizes)) < 2:
+        return None
+    return float(np.polyfit(np.log(sizes), np.log(seconds), 1)[0])
+
+
+def scaling(results: list) -> list:
+    """Warm latency scaling exponents with time_steps and batch size, per model and solver."""
+    rows = []
+    ok = [result for result in results if 'error' not in result]
+    groups = sorted({(r['model'], r['backend'], str(r['solver'])) for r in ok})
+    for model, backend, solver in groups:
+        group = [r for r in ok if (r['model'], r['backend'], str(r['solver'])) == (model, backend, solver)]
+        smallest_batch = min(r['batch'] for r in group)
+        smallest_steps = min(r['time_steps'] for r in group)
+        by_steps = [r for r in group if r['batch'] == smallest_batch]
+        by_batch = [r for r in group if r['time_steps'] == smallest_steps]
+        rows.append({'model': model, 'backend': backend, 'solver': solver,
+                     'time_steps_exponent': fit_exponent([r['time_steps'] for r in by_steps],
+                                                         [r['warm_median_seconds'] for r in by_steps]),
+                     'batch_exponent': fit_exponent([r['batch'] for r in by_batch],
+                                                    [r['warm_median_seconds'] for r in by_batch])})
+    return rows
+
+
+def metadata() -> dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True).stdout.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    try:
+        import scipy
+        scipy_version = scipy.__version__
+    except ImportError:
+        scipy_version = None
+    return {'commit': commit, 'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'python': platform.python_version(), 'numpy': np.__version__, 'scipy': scipy_version,
+            'platform': platform.platform(), 'cpu_count': os.cpu_count()}
+
+
+def compare(results: list, baseline: list, tolerance: float) -> list:
+    """Cases whose warm median latency grew by more than tolerance over the baseline."""
+    previous = {tuple(r[k] for k in KEY): r for r in baseline if 'error' not in r}
+    regressions = []
+    for result in results:
+        old = previous.get(tuple(result[k] for k in KEY))
+        if old is None or 'error' in result:
+            continue
+        ratio = result['warm_median_seconds'] / old['warm_median_seconds']
+        print('%-20s %-10s %-10s %7d %4d  %8.4fs -> %8.4fs  x%.2f'
+              % (tuple(str(result[k]) if k == 'solver' else result[k] for k in KEY)
+                 + (old['warm_median_seconds'], result['warm_median_seconds'], ratio)))
+        if ratio > 1 + tolerance:
+            regressions.append(dict(result, baseline_seconds=old['warm_median_seconds'], ratio=ratio))
+    return regressions
+
+
+def main(argv=None):
+    model_classes = models()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--models', nargs='+', default=sorted(model_classes), choices=sorted(model_classes))
+    parser.add_argument('--backends', nargs='+', choices=['numpy', 'tensorflow', 'numba'],
+                        help='defaults to numpy, and tensorflow and numba when they are installed')
+    parser.add_argument('--solvers', nargs='+', default=SOLVERS + JIT_SOLVERS, choices=SOLVERS + JIT_SOLVERS)
+    parser.add_argument('--steps', nargs='+', type=int, default=[1000, 10000], help='time_steps values')
+    parser.add_argument('--batch', nargs='+', type=int, default=[1, 16], help='batch sizes, 1 uses Model.solve')
+    parser.add_argument('--repeat', type=int, default=3, help='warm solves per case')
+    parser.add_argument('--no-cold', dest='cold', action='store_false', help='skip the cold latency subprocesses')
+    parser.add_argument('--no-import', dest='import_time', action='store_false', help='skip the import benchmark')
+    parser.add_argument('--output', help='path of the JSON results, printed when omitted')
+    parser.add_argument('--compare', help='JSON results of a previous run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed fractional warm latency increase')
+    args = parser.parse_args(argv)
+
+    backends = args.backends or ['numpy'] + [name for name in ('tensorflow', 'numba') if available(name)]
+    results = []
+    for model in args.models:
+        for backend, solver in configurations(backends, args.solvers):
+            for time_steps in args.steps:
+                for batch in args.batch:
+                    case = {'model': model, 'backend': backend, 'solver': solver,
+                            'time_steps': time_steps, 'batch': batch}
+                    try:
+                        result = measure(case, args.repeat, args.cold)
+                    except Exception as error:
+                        result = dict(case, error='%s: %s' % (type(error).__name__, error))
+                    print(json.dumps(result), file=sys.stderr)
+                    results.append(result)
+
+    report = {'benchmark': 'solve', 'metadata': metadata(), 'results': results, 'scaling': scaling(results)}
+    if args.import_time:
+        import bench_import
+        seconds = [run['seconds'] for run in bench_import.measure(3)]
+        report['import_median_seconds'] = statistics.median(seconds)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    # The numba kernels are hand written copies of the equations
+    mismatched = sorted({result['model'] for result in results if (result.get('kernel_error') or 0) > 1e-12})
+    if mismatched:
+        print('numba kernels differ from the equations of %s' % ', '.join(mismatched), file=sys.stderr)
+        return 1
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print('%d case(s) slower than the baseline by more than %d%%'
+                  % (len(regressions), 100 * args.tolerance), file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+"""Stiff solver accuracy check
+
+Solves stiff fizzpy.core models with the NumPy backend's Radau and
+Rosenbrock integrators and with SciPy's solve_ivp Radau at the same
+tolerances, and reports the steps taken and the error of each against a
+tight tolerance odeint reference. Exits non-zero if a fizzpy integrator's
+error is more than --factor times SciPy's, so it can gate CI.
+
+    python benchmarks/bench_stiff.py --models Vanderpol HodgkinHuxley --factor 10
+"""
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+from scipy import integrate
+
+from fizzpy import core
+from fizzpy.backends import NumpyOps
+
+
+# Model attributes for each case, Vanderpol's mu is raised to make it stiff
+CASES = {
+    'Vanderpol': {'model_parameters': [1000.], 'final_time': 50, 'time_steps': 2501},
+    'HodgkinHuxley': {'final_time': 100, 'time_steps': 1001},
+    'HIV': {'final_time': 5000, 'time_steps': 5001},
+}
+
+SOLVERS = ['radau', 'rosenbrock']
+
+
+def setup(model: str):
+    """Build the model for a case."""
+    instance = getattr(core, model)()
+    for name, value in CASES[model].items():
+        setattr(instance, name, value)
+    return instance
+
+
+def relative_error(arg1: np.ndarray, arg2: np.ndarray) -> float:
+    """Largest deviation of arg1 from the reference arg2, relative to its largest value."""
+    return float(np.abs(arg1 - arg2).max() / np.abs(arg2).max())
+
+
+def scipy_radau(instance, t: np.ndarray, rtol: float, atol: float) -> dict:
+    """Solve with solve_ivp Radau, returns the solution and its step counts.
+
+    `solve_ivp <https://docs.scipy.org/doc/scipy/reference/generated/scipy.integrate.solve_ivp.html>`_
+    """
+    p = np.asarray(instance.model_parameters, dtype=np.float64)
+
+    def func(t, y):
+        return instance.equations(y, t, p, NumpyOps)
+    jac = None
+    if instance.jacobian is not None:
+        def jac(t, y):
+            return instance.jacobian(y, t, p, NumpyOps)
+    start = time.perf_counter()
+    result = integrate.solve_ivp(func, (t[0], t[-1]), np.asarray(instance.initial_conditions, dtype=np.float64),
+                                 method='Radau', t_eval=t, rtol=rtol, atol=atol, jac=jac)
+    seconds = time.perf_counter() - start
+    if not result.success:
+        raise RuntimeError(result.message)
+    # Into the model's output convention, as Model.solve returns it
+    return {'y': instance.output_converter(result.y), 'seconds': seconds, 'nfev': result.nfev, 'njev': result.njev, 'nlu': result.nlu}
+
+
+def check(model: str, rtol: float, atol: float) -> list:
+    """Solve one model with every solver, returns a result per solver."""
+    instance = setup(model)
+    t = np.linspace(0, instance.final_time, instance.time_steps)
+    reference = np.asarray(instance.solve(backend='numpy', solver='odeint', rtol=1e-12, atol=1e-12, mxstep=10 ** 6))
+
+    results = []
+    scipy = scipy_radau(instance, t, rtol, atol)
+    results.append({'model': model, 'solver': 'scipy_radau', 'seconds': scipy['seconds'], 'nfev': scipy['nfev'],
+                    'njev': scipy['njev'], 'nlu': scipy['nlu'], 'error': relative_error(scipy['y'], reference)})
+    for solver in SOLVERS:
+        start = time.perf_counter()
+        y = np.asarray(instance.solve(backend='numpy', solver=solver, rtol=rtol, atol=atol))
+        seconds = time.perf_counter() - start
+        result = {'model': model, 'solver': solver, 'seconds': seconds, 'error': relative_error(y, reference)}
+        result.update(instance.stats.info())
+        results.append(result)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--models', nargs='+', default=sorted(CASES), choices=sorted(CASES))
+    parser.add_argument('--rtol', type=float, default=1e-6)
+    parser.add_argument('--atol', type=float, default=1e-9)
+    parser.add_argument('--factor', type=float, default=10., help="allowed error as a multiple of SciPy Radau's")
+    args = parser.parse_args(argv)
+
+    failed = []
+    results = []
+    for model in args.models:
+        model_results = check(model, args.rtol, args.atol)
+        scipy = model_results[0]['error']
+        for result in model_results:
+            print(json.dumps(result), file=sys.stderr)
+            # Rosenbrock is second order and is only expected to match at loose tolerances
+            if result['solver'] == 'radau' and result['error'] > args.factor * max(scipy, args.rtol):
+                failed.append('%s %s error %.3g, SciPy Radau %.3g' % (model, result['solver'], result['error'],
+                                                                       scipy))
+        results.extend(model_results)
+    print(json.dumps(results, indent=2))
+
+    for message in failed:
+        print(message, file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
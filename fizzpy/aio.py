@@ -0,0 +1,238 @@
+import asyncio
+import concurrent.futures
+import os
+
+import numpy as np
+
+from fizzpy import cache, parallel
+
+
+# Solve keyword arguments that only Model.solve accepts, requests using them are never coalesced
+SOLVE_ONLY = ('out', 'output_path', 'cache', 'reductions', 'checkpoint')
+
+# Executor used by Model.solve_async and Model.solve_batch_async, created on first use
+_default = []
+
+
+def default():
+    """The shared SolveExecutor."""
+    if not _default:
+        _default.append(SolveExecutor())
+    return _default[0]
+
+
+def run_solve(model, backend, solver, options: dict) -> list:
+    """Model.solve on a copy of model, so concurrent solves never share its solution or stats."""
+    model = parallel.worker_model(model)
+    return [model.solve(backend, solver, **options), model.stats]
+
+
+def run_batch(model, arg1: np.ndarray, arg2: np.ndarray, backend, solver, options: dict) -> list:
+    """Model.solve_batch on a copy of model."""
+    model = parallel.worker_model(model)
+    return [model.solve_batch(arg1, arg2, backend, solver, **options), model.stats]
+
+
+class Batch:
+
+    """Batch
+
+    Requests with the same batch key waiting to be solved together, and
+    the executor job solving them once flushed.
+    """
+
+    def __init__(self, model, backend, solver, options: dict):
+        self.model = model
+        self.backend = backend
+        self.solver = solver
+        self.options = options
+        # (init_states [n, d], parameters [n, p], single, future) per request
+        self.requests = []
+        self.handle = None
+        self.job = None
+
+    def abandon(self, future):
+        """Cancel the executor job once every request waiting on it is cancelled."""
+        if self.job is not None and all(request[3].cancelled() for request in self.requests):
+            self.job.cancel()
+
+
+class SolveExecutor:
+
+    """Solve executor
+
+    Runs solves of fizzpy.core models off the event loop, on a bounded pool
+    of threads, for asyncio applications:
+
+        executor = SolveExecutor(max_workers=4, max_pending=64)
+        solution = await executor.solve(Lorenz(model_parameters=p), coalesce=True)
+
+    Requests passing coalesce=True that arrive within linger seconds of
+    each other and differ only in initial conditions and model parameters
+    are coalesced into one Model.solve_batch call, up to max_batch
+    trajectories, and each caller gets its own rows back. A lone request
+    is run as a plain Model.solve. Coalesced trajectories share the
+    batch's adaptive step size, so they agree with their own solve to the
+    solver's tolerance rather than exactly, and depend on what else was in
+    flight; by default every request is solved alone.
+
+    At most max_pending requests are admitted at once, later ones wait
+    for a slot, so a burst queues in the callers instead of piling work
+    onto the pool. Cancelling a request removes it from its batch; a job
+    is cancelled once all of its requests are, unless it has already
+    started, in which case its result is discarded.
+    """
+
+    def __init__(self, max_workers: int = None, max_pending: int = 64, max_batch: int = 256, linger: float = 0.002,
+                 pool: concurrent.futures.Executor = None):
+        if max_workers is None:
+            max_workers = min(4, os.cpu_count() or 1)
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers, 'fizzpy') if pool is None else pool
+        self.max_pending = max_pending
+        self.max_batch = max_batch
+        self.linger = linger
+        self.batches = {}
+        self.slots = None
+
+    def admission(self) -> asyncio.Semaphore:
+        if self.slots is None:
+            self.slots = asyncio.Semaphore(self.max_pending)
+        return self.slots
+
+    async def solve(self, model, backend=None, solver=None, coalesce: bool = False, **options):
+        """Solve.
+
+        Parameters
+        ----------
+        model
+            Model to solve, with its own initial conditions and parameters.
+        backend
+            'tensorflow', 'numpy' or 'numba', see Model.solve.
+        solver
+            Solver, see Model.solve.
+        coalesce
+            Allow merging this solve into a batch with others, trading
+            exact reproducibility for throughput.
+        options
+            Keyword arguments of Model.solve, e.g. rtol and atol.
+
+        Returns
+        -------
+        np.ndarray
+            The solution, as Model.solve returns it when run alone and
+            shaped [d, T] when coalesced. model.solution and model.stats
+            are set when it arrives.
+
+        """
+        async with self.admission():
+            if coalesce and not any(name in options for name in SOLVE_ONLY) and model.cache is None:
+                rows = model.batch_converter(model.initial_conditions, model.model_parameters)
+                solution, stats = await self.submit(model, rows[0], rows[1], True, backend, solver, options)
+            else:
+                solution, stats = await asyncio.get_running_loop().run_in_executor(
+                    self.pool, run_solve, model, backend, solver, options)
+        model.solution, model.stats = solution, stats
+        return solution
+
+    async def solve_batch(self, model, initial_conditions=None, model_parameters=None, backend=None, solver=None,
+                          coalesce: bool = False, **options) -> np.ndarray:
+        """Solve batch.
+
+        Parameters
+        ----------
+        model
+            Model to solve.
+        initial_conditions
+            Initial conditions, shape [d] or [N, d], defaults to the model's.
+        model_parameters
+            Model parameters, shape [p] or [N, p], defaults to the model's.
+        backend
+            'tensorflow', 'numpy' or 'numba', see Model.solve_batch.
+        solver
+            Solver, see Model.solve_batch.
+        coalesce
+            Allow merging this batch with other requests, trading exact
+            reproducibility for throughput.
+        options
+            Keyword arguments of Model.solve_batch, e.g. rtol and atol.
+
+        Returns
+        -------
+        np.ndarray
+            Solutions of shape [N, d, T]. model.stats is set when they arrive.
+
+        """
+        if initial_conditions is None:
+            initial_conditions = model.initial_conditions
+        if model_parameters is None:
+            model_parameters = model.model_parameters
+        init_states, parameters = model.batch_converter(initial_conditions, model_parameters)
+        async with self.admission():
+            if coalesce and not any(name in options for name in SOLVE_ONLY):
+                solutions, stats = await self.submit(model, init_states, parameters, False, backend, solver, options)
+            else:
+                solutions, stats = await asyncio.get_running_loop().run_in_executor(
+                    self.pool, run_batch, model, init_states, parameters, backend, solver, options)
+        model.stats = stats
+        return solutions
+
+    def batch_key(self, model, arg1: np.ndarray, arg2: np.ndarray, backend, solver, options: dict) -> str:
+        """Everything in the model's cache key but its initial conditions and parameters, and their widths."""
+        key = model.cache_key(backend, solver, options)
+        return cache.digest(*key[:2], *key[4:], arg1.shape[1], arg2.shape[1])
+
+    def submit(self, model, arg1: np.ndarray, arg2: np.ndarray, single: bool, backend, solver,
+               options: dict) -> asyncio.Future:
+        """Add rows to the batch of their key, flushed after linger seconds or once max_batch rows are waiting."""
+        loop = asyncio.get_running_loop()
+        key = self.batch_key(model, arg1, arg2, backend, solver, options)
+        batch = self.batches.get(key)
+        if batch is None:
+            batch = self.batches[key] = Batch(model, backend, solver, options)
+            batch.handle = loop.call_later(self.linger, self.flush, key)
+        future = loop.create_future()
+        future.add_done_callback(batch.abandon)
+        batch.requests.append((arg1, arg2, single, future))
+        if sum(len(request[0]) for request in batch.requests) >= self.max_batch:
+            batch.handle.cancel()
+            self.flush(key)
+        return future
+
+    def flush(self, key: str):
+        """Start solving a batch, without the requests cancelled while it waited."""
+        loop = asyncio.get_running_loop()
+        batch = self.batches.pop(key)
+        batch.requests = [request for request in batch.requests if not request[3].cancelled()]
+        if not batch.requests:
+            return
+        if len(batch.requests) == 1 and batch.requests[0][2]:
+            job = loop.run_in_executor(self.pool, run_solve, batch.model, batch.backend, batch.solver, batch.options)
+        else:
+            init_states = np.concatenate([request[0] for request in batch.requests])
+            parameters = np.concatenate([request[1] for request in batch.requests])
+            job = loop.run_in_executor(self.pool, run_batch, batch.model, init_states, parameters, batch.backend,
+                                       batch.solver, batch.options)
+        batch.job = job
+        job.add_done_callback(lambda job: self.deliver(job, batch))
+
+    def deliver(self, job: asyncio.Future, batch: Batch):
+        """Hand each request its rows of the solved batch."""
+        single = len(batch.requests) == 1 and batch.requests[0][2]
+        start = 0
+        for init_states, _, alone, future in batch.requests:
+            stop = start + len(init_states)
+            if future.cancelled():
+                pass
+            elif job.cancelled():
+                future.cancel()
+            elif job.exception() is not None:
+                future.set_exception(job.exception())
+            else:
+                solutions, stats = job.result()
+                rows = solutions if single else solutions[start] if alone else solutions[start:stop]
+                future.set_result([rows, stats])
+            start = stop
+
+    def close(self, wait: bool = True):
+        """Shut the thread pool down."""
+        self.pool.shutdown(wait)
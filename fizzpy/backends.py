@@ -0,0 +1,336 @@
+import time
+
+import numpy as np
+
+from fizzpy import integrators
+
+
+def tensorflow():
+    """Tensorflow importer.
+
+    Tensorflow is only imported the first time a graph is built, so
+    importing fizzpy, or solving with the NumPy backend, never loads it.
+    It is an optional dependency, installed with the tensorflow extra.
+
+    Returns
+    -------
+    module
+        The tensorflow module.
+
+    """
+    try:
+        import tensorflow as tf
+    except ImportError as error:
+        raise ImportError("The tensorflow backend needs Tensorflow, install it with "
+                          "pip install fizzpy[tensorflow] or solve with backend='numpy'.") from error
+
+    return tf
+
+
+# Fixed step solvers of the numba backend, see fizzpy.jit.SOLVERS
+JIT_SOLVERS = ('euler', 'rk2', 'rk4')
+
+
+def numba_backend():
+    """Numba backend importer.
+
+    fizzpy.jit, and with it Numba, is only imported the first time the
+    numba backend is used.
+
+    Returns
+    -------
+    module
+        The fizzpy.jit module.
+
+    """
+    from fizzpy import jit
+
+    return jit
+
+
+class NumpyOps:
+
+    """NumPy operations
+
+    Array operations used by the model equations, backed by NumPy.
+    States may be a single [d] vector or a [d, N] batch.
+    """
+
+    exp = staticmethod(np.exp)
+    log = staticmethod(np.log)
+    sqrt = staticmethod(np.sqrt)
+    sin = staticmethod(np.sin)
+    cos = staticmethod(np.cos)
+    sinh = staticmethod(np.sinh)
+    tanh = staticmethod(np.tanh)
+    cosh = staticmethod(np.cosh)
+    stack = staticmethod(np.stack)
+    concat = staticmethod(np.concatenate)
+
+    @staticmethod
+    def unstack(arg1):
+        return list(arg1)
+
+    @staticmethod
+    def matrix(arg1):
+        """Stack rows of scalars and [N] vectors into a [d, d] or [d, d, N] array."""
+        entries = np.broadcast_arrays(*[entry for row in arg1 for entry in row])
+        return np.stack(entries).reshape((len(arg1), len(arg1[0])) + entries[0].shape)
+
+
+class TensorflowOps:
+
+    """Tensorflow operations
+
+    Array operations used by the model equations, backed by Tensorflow.
+    """
+
+    @staticmethod
+    def exp(arg1):
+        return tensorflow().exp(arg1)
+
+    @staticmethod
+    def log(arg1):
+        return tensorflow().log(arg1)
+
+    @staticmethod
+    def sqrt(arg1):
+        return tensorflow().sqrt(arg1)
+
+    @staticmethod
+    def sin(arg1):
+        return tensorflow().sin(arg1)
+
+    @staticmethod
+    def cos(arg1):
+        return tensorflow().cos(arg1)
+
+    @staticmethod
+    def sinh(arg1):
+        return tensorflow().sinh(arg1)
+
+    @staticmethod
+    def tanh(arg1):
+        return tensorflow().tanh(arg1)
+
+    @staticmethod
+    def cosh(arg1):
+        return tensorflow().cosh(arg1)
+
+    @staticmethod
+    def stack(arg1):
+        return tensorflow().stack(arg1)
+
+    @staticmethod
+    def concat(arg1):
+        return tensorflow().concat(arg1, 0)
+
+    @staticmethod
+    def unstack(arg1):
+        return tensorflow().unstack(arg1)
+
+
+def numpy_odeint(arg1, arg2: np.ndarray, arg3: np.ndarray, t: np.ndarray, **options) -> list:
+    """NumPy ODE solver.
+
+    Uses SciPy odeint (LSODA) to numerically solve the system of ODEs. A
+    [d, N] batch is integrated as one system laid out trajectory by
+    trajectory, so its Jacobian is banded and LSODA never forms the full
+    [N * d, N * d] matrix.
+
+    `odeint <https://docs.scipy.org/doc/scipy/reference/generated/scipy.integrate.odeint.html>`_
+
+    Parameters
+    ----------
+    arg1
+        Equations for the system of ODEs, called as arg1(state, t, p, ops).
+    arg2
+        Initial conditions, shape [d] or [d, N].
+    arg3
+        Model parameters, shape [p] or [p, N].
+    t
+        Time points to solve for.
+    options
+        Keyword arguments passed on to odeint, e.g. rtol and atol. odeint
+        solves in float64 only, dtype may only be float64.
+
+    Returns
+    -------
+    list
+        y: solved state for each time point, shape [T, d] or [T, d, N].
+        info_dict: additional info returned by odeint.
+
+    """
+    from scipy import integrate
+
+    if np.dtype(options.pop('dtype', np.float64)) != np.float64:
+        raise ValueError("odeint solves in float64 only, use 'dopri5', 'rosenbrock' or 'radau' for other dtypes.")
+    shape = arg2.shape
+    transposed = shape[::-1]
+
+    def func(y, t):
+        return arg1(y.reshape(transposed).T, t, arg3, NumpyOps).T.reshape(-1)
+
+    bandwidth = shape[0] - 1 if len(shape) > 1 else None
+    state, info = integrate.odeint(func, arg2.T.reshape(-1), t, ml=bandwidth, mu=bandwidth, full_output=True,
+                                   **options)
+    state = state.reshape((len(t),) + transposed).transpose((0,) + tuple(range(len(shape), 0, -1)))
+    return [state, info]
+
+
+def numpy_solver(arg1, arg2: np.ndarray, arg3: np.ndarray, t: np.ndarray, solver=None, jacobian=None,
+                 **options) -> list:
+    """NumPy solver selector.
+
+    Solves the system of ODEs with SciPy odeint, or with one of the
+    integrators in fizzpy.integrators.
+
+    Parameters
+    ----------
+    arg1
+        Equations for the system of ODEs, called as arg1(state, t, p, ops).
+    arg2
+        Initial conditions, shape [d] or [d, N].
+    arg3
+        Model parameters, shape [p] or [p, N].
+    t
+        Time points to solve for.
+    solver
+        'odeint' (default) or a key of fizzpy.integrators.SOLVERS.
+    jacobian
+        Jacobian of the equations, called as jacobian(state, t, p, ops),
+        used by the implicit solvers.
+    options
+        Keyword arguments for the solver, e.g. rtol and atol.
+
+    Returns
+    -------
+    list
+        y: solved state for each time point, shape [T, d] or [T, d, N].
+        info_dict: additional info returned by the solver.
+
+    """
+    if solver is None or solver == 'odeint':
+        return numpy_odeint(arg1, arg2, arg3, t, **options)
+    integrator = numpy_integrator(arg1, arg2, arg3, t[0], t[-1], solver, jacobian, **options)
+    state = integrators.integrate(integrator, t)
+    return [state, integrator.info()]
+
+
+def numpy_integrator(arg1, arg2: np.ndarray, arg3: np.ndarray, t0: float, t_bound: float, solver, jacobian=None,
+                     **options) -> integrators.Integrator:
+    """NumPy integrator factory.
+
+    Parameters
+    ----------
+    arg1
+        Equations for the system of ODEs, called as arg1(state, t, p, ops).
+    arg2
+        Initial conditions, shape [d] or [d, N].
+    arg3
+        Model parameters, shape [p] or [p, N].
+    t0
+        Initial time.
+    t_bound
+        Time the integrator may not step past.
+    solver
+        Key of fizzpy.integrators.SOLVERS.
+    jacobian
+        Jacobian of the equations, used by the implicit solvers.
+    options
+        Keyword arguments for the integrator, e.g. rtol, atol and dtype.
+        The parameters are converted to dtype along with the state.
+
+    Returns
+    -------
+    integrators.Integrator
+        Integrator positioned at t0.
+
+    """
+    if solver not in integrators.SOLVERS:
+        raise ValueError("Unknown solver %r, expected 'odeint' or one of %s." % (solver, sorted(integrators.SOLVERS)))
+    integrator_class = integrators.SOLVERS[solver]
+    if getattr(integrator_class, 'uses_jacobian', False):
+        options.setdefault('jac', jacobian)
+    if 'dtype' in options:
+        arg3 = np.asarray(arg3, dtype=options['dtype'])
+    return integrator_class(arg1, arg2, t0=t0, args=(arg3, NumpyOps), t_bound=t_bound, **options)
+
+
+def numpy_chunks(arg1, arg2: np.ndarray, arg3: np.ndarray, chunks, t_bound: float, solver=None, jacobian=None,
+                 stats=None, checkpoint=None, **options):
+    """NumPy chunked solver.
+
+    Solves the system of ODEs over consecutive chunks of the output grid,
+    carrying the state from one chunk to the next, so only one chunk is
+    held in memory at a time. The integrators keep stepping across chunk
+    boundaries; SciPy odeint is restarted from the last state of the
+    previous chunk.
+
+    Parameters
+    ----------
+    arg1
+        Equations for the system of ODEs, called as arg1(state, t, p, ops).
+    arg2
+        Initial conditions, shape [d] or [d, N].
+    arg3
+        Model parameters, shape [p] or [p, N].
+    chunks
+        Iterable of consecutive, increasing time arrays.
+    t_bound
+        Last time of the last chunk.
+    solver
+        'odeint' (default) or a key of fizzpy.integrators.SOLVERS.
+    jacobian
+        Jacobian of the equations, used by the implicit solvers.
+    stats
+        Optional fizzpy.profiling.SolveStats, updated with the solver's
+        counters and integrate_time after every chunk.
+    checkpoint
+        Optional fizzpy.checkpoint.Checkpoint, opened for this run, to
+        carry on from and to save progress in once each chunk has been
+        written to its output, that is when the next one is asked for.
+        chunks then start at checkpoint.done.
+    options
+        Keyword arguments for the solver, e.g. rtol and atol.
+
+    Yields
+    ------
+    tuple
+        t: the chunk's time points.
+        y: solved state for each of them, shape [k, d] or [k, d, N].
+
+    """
+    restart = None if checkpoint is None else checkpoint.state
+    done = 0 if checkpoint is None else checkpoint.done
+    if solver is None or solver == 'odeint':
+        y, t_last = (arg2, None) if restart is None else (restart['y'], restart['t'])
+        for t in chunks:
+            started = time.perf_counter()
+            grid = t if t_last is None else np.concatenate(([t_last], t))
+            state, info = numpy_odeint(arg1, y, arg3, grid, **options)
+            state = state if t_last is None else state[1:]
+            y, t_last = state[-1].copy(), t[-1]
+            if stats is not None:
+                stats.integrate_time += time.perf_counter() - started
+                stats.add(info)
+            yield t, state
+            done += len(t)
+            if checkpoint is not None and (checkpoint.due() or t_last >= t_bound):
+                checkpoint.save(done, y=y, t=t_last)
+        return
+    integrator = None
+    for t in chunks:
+        started = time.perf_counter()
+        if integrator is None:
+            integrator = numpy_integrator(arg1, arg2, arg3, t[0], t_bound, solver, jacobian, **options)
+            if restart is not None:
+                integrator.restore(restart['integrator'])
+        state = integrators.integrate(integrator, t)
+        if stats is not None:
+            stats.integrate_time += time.perf_counter() - started
+            stats.update(integrator.info())
+        yield t, state
+        done += len(t)
+        if checkpoint is not None and (checkpoint.due() or t[-1] >= t_bound):
+            checkpoint.save(done, integrator=integrator.state())
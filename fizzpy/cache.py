@@ -0,0 +1,132 @@
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+
+def digest(*parts) -> str:
+    """SHA-256 of configuration parts, arrays by dtype, shape and contents, anything else by repr."""
+    sha = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            sha.update(repr((part.dtype.str, part.shape)).encode())
+            sha.update(np.ascontiguousarray(part).tobytes())
+        else:
+            sha.update(repr(part).encode())
+        sha.update(b'\0')
+    return sha.hexdigest()
+
+
+class SolutionCache:
+
+    """Solution cache
+
+    Content-addressed on-disk cache of solutions. Each entry is a .npy file
+    named by the SHA-256 of the configuration that produced it, so a hit
+    is served as a read-only memmap without solving or reading the whole
+    file. The directory is kept under max_bytes by evicting the least
+    recently used entries.
+    """
+
+    suffix = '.npy'
+
+    def __init__(self, directory, max_bytes=2 ** 30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, *parts) -> str:
+        """Hash configuration parts, see digest."""
+        return digest(*parts)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.suffix)
+
+    def get(self, key: str) -> np.ndarray:
+        """Get.
+
+        Parameters
+        ----------
+        key
+            Entry key.
+
+        Returns
+        -------
+        np.ndarray
+            Read-only memmap of the entry, or None on a miss.
+
+        """
+        path = self.path(key)
+        try:
+            solution = np.load(path, mmap_mode='r')
+        except (FileNotFoundError, ValueError):
+            self.misses += 1
+            return None
+        os.utime(path)
+        self.hits += 1
+        return solution
+
+    def put(self, key: str, arg1: np.ndarray):
+        """Put.
+
+        Writes the entry atomically, then evicts least recently used entries
+        until the cache fits in max_bytes.
+
+        Parameters
+        ----------
+        key
+            Entry key.
+        arg1
+            Solution to store.
+
+        """
+        handle, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as f:
+                np.save(f, np.asarray(arg1))
+            os.replace(temporary, self.path(key))
+        except BaseException:
+            os.remove(temporary)
+            raise
+        self.evict()
+
+    def entries(self) -> list:
+        """Cache entries as (last use, size, path), least recently used first."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(self.suffix):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return sorted(entries)
+
+    def size(self) -> int:
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.evictions += 1
+
+    def clear(self):
+        for _, _, path in self.entries():
+            os.remove(path)
+
+    def stats(self) -> dict:
+        """Hit, miss and eviction counters, hit rate, entry count and size in bytes."""
+        entries = self.entries()
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0., 'entries': len(entries),
+                'bytes': sum(size for _, size, _ in entries)}
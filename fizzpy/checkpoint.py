@@ -0,0 +1,124 @@
+import os
+import tempfile
+import time
+
+import numpy as np
+
+
+class Checkpoint:
+
+    """Checkpoint
+
+    Directory a long solve, batch or sweep keeps its progress in, so a run
+    that is interrupted is picked up where it was checkpointed by calling
+    it again with the same arguments:
+
+        model.solve(solver='dopri5', checkpoint=Checkpoint('run', every=300))
+
+    output.npy holds the solution and is written in place as it is solved.
+    state.npz records the configuration's digest, how much of the output
+    is done and what carrying on from there takes: the integrator's whole
+    state, the last state for odeint, or the finished blocks of a sweep.
+    It is saved atomically, after flushing the output, at most every
+    `every` seconds and once the run completes, so a resumed run takes the
+    same steps as an uninterrupted one and its output is identical bit for
+    bit. Work done after the last save is redone.
+    """
+
+    def __init__(self, directory, every: float = 60.):
+        self.directory = directory
+        self.every = every
+        self.key = None
+        self.output = None
+        self.state = None
+        self.saved = None
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    @property
+    def done(self) -> int:
+        """Time points, or rows of a sweep, completed at the last save."""
+        return 0 if self.state is None else int(self.state['done'])
+
+    def open(self, key: str, shape: tuple, fortran_order: bool = True, dtype=np.float64) -> np.memmap:
+        """Open.
+
+        Loads the saved state of the run and maps its output, or creates
+        both for a new run.
+
+        Parameters
+        ----------
+        key
+            Digest of the run's configuration, see fizzpy.cache.digest.
+        shape
+            Shape of the output.
+        fortran_order
+            Lay a new output out time-major, for runs written chunk by chunk.
+        dtype
+            Floating point type of a new output.
+
+        Returns
+        -------
+        np.memmap
+            The output, with the first done entries already solved.
+
+        """
+        state = self.load()
+        if state is not None and state['key'] != key:
+            raise ValueError('Checkpoint %s holds another run, pass the same arguments to resume it or use another '
+                             'directory.' % self.directory)
+        if state is None:
+            self.output = np.lib.format.open_memmap(self.path('output.npy'), mode='w+', dtype=dtype, shape=shape,
+                                                    fortran_order=fortran_order)
+        else:
+            self.output = np.load(self.path('output.npy'), mmap_mode='r+')
+        self.key, self.state, self.saved = key, state, time.monotonic()
+        return self.output
+
+    def load(self) -> dict:
+        """The saved state, a dict of names to arrays and numbers, with 'a.b' entries grouped in dict a, or None."""
+        if not os.path.exists(self.path('state.npz')):
+            return None
+        state = {}
+        with np.load(self.path('state.npz')) as data:
+            for name in data.files:
+                value = data[name].item() if data[name].ndim == 0 else data[name]
+                group, _, field = name.rpartition('.')
+                (state.setdefault(group, {}) if group else state)[field] = value
+        return state
+
+    def due(self) -> bool:
+        return time.monotonic() - self.saved >= self.every
+
+    def save(self, done: int, **state):
+        """Save.
+
+        Flushes the output, then replaces the saved state in one rename.
+
+        Parameters
+        ----------
+        done
+            Time points, or rows of a sweep, completed.
+        state
+            Arrays and numbers to carry on from, and dicts of them.
+
+        """
+        self.output.flush()
+        arrays = {'key': self.key, 'done': done}
+        for name, value in state.items():
+            if isinstance(value, dict):
+                arrays.update((name + '.' + field, entry) for field, entry in value.items())
+            else:
+                arrays[name] = value
+        handle, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(temporary, self.path('state.npz'))
+        except BaseException:
+            os.remove(temporary)
+            raise
+        self.state = dict(state, key=self.key, done=done)
+        self.saved = time.monotonic()
@@ -1,5 +1,79 @@
+import atexit
+import functools
+import itertools
+import os
+import threading
+import time
+
 import numpy as np
-import tensorflow as tf
+
+from fizzpy import frequency, lyapunov, parallel, profiling
+from fizzpy.backends import JIT_SOLVERS, TensorflowOps, numba_backend, numpy_chunks, numpy_integrator, numpy_solver, \
+    tensorflow
+from fizzpy.cache import digest
+from fizzpy.checkpoint import Checkpoint
+from fizzpy.integrators import Event, EventLocator, advance, integrate
+from fizzpy.solution import Solution
+
+
+class CompiledGraph:
+
+    """Compiled graph
+    Holds a Tensorflow graph and session for one model class, state dimension
+    and time grid, along with the placeholders fed on every solve.
+    """
+
+    def __init__(self, graph, session, initial_conditions, model_parameters, fetches):
+        self.graph = graph
+        self.session = session
+        self.initial_conditions = initial_conditions
+        self.model_parameters = model_parameters
+        self.fetches = fetches
+
+    def run(self, arg1: np.ndarray, arg2: np.ndarray) -> list:
+        """Run the compiled graph.
+
+        Parameters
+        ----------
+        arg1
+            Initial conditions fed to the initial_conditions placeholder.
+        arg2
+            Model parameters fed to the model_parameters placeholder.
+
+        Returns
+        -------
+        list
+            state: solved value of the state for each time point.
+            info: additional info returned by odeint.
+
+        """
+        return self.session.run(self.fetches, feed_dict={self.initial_conditions: arg1,
+                                                         self.model_parameters: arg2})
+
+    def close(self):
+        """Close the session and release the resources held by the graph."""
+        self.session.close()
+
+
+class Continuation:
+
+    """Continuation
+    Where a solve stopped: the backend, solver and options it used, its
+    last time and state, before output conversion, and the integrator when
+    one can keep stepping, so Model.extend carries on from there. stored
+    tells whether Model.solution holds the solution up to there, it does
+    not for streamed solves, and path is the .npy file it was written to.
+    """
+
+    def __init__(self, backend, solver, options, t, y, integrator=None, stored=True, path=None):
+        self.backend = backend
+        self.solver = solver
+        self.options = options
+        self.t = t
+        self.y = y
+        self.integrator = integrator
+        self.stored = stored
+        self.path = path
 
 
 class Model:
@@ -8,6 +82,25 @@ class Model:
     Used for storing methods that generalize to all models.
     """
 
+    backend = 'tensorflow'
+    cache = None
+    spike_threshold = None
+    # Index of the injected current in model_parameters, for neuron models
+    input_parameter = None
+    # Names of the state components, in order, see components
+    state_names = ()
+    # NumPy solver used when none is given, SciPy odeint unless a model needs otherwise
+    solver = None
+    # Trajectories of a reduced precision batch solved again in float64 to measure its drift, see precision_drift
+    drift_sample = 4
+    compiled_graphs = {}
+    # Held while a graph is looked up and built, so threads solving the same key share one session
+    compile_lock = threading.Lock()
+    # Models may define jacobian(state, t, p, ops) returning the [d, d]
+    # Jacobian of equations, used by the implicit solvers. Without one it
+    # is estimated by finite differences of equations.
+    jacobian = None
+
     def __init__(
             self,
             initial_conditions=None,
@@ -19,13 +112,11 @@ class Model:
         self.final_time = final_time
         self.time_steps = time_steps
 
-    def init_converter(self, arg1: np.array) -> tf.constant:
+    def init_converter(self, arg1: np.array) -> np.ndarray:
         """Initial conditions converter.
 
-        Converts the initial_conditions ndarray into a Tensorflow
-        constant n-dimensional tensor.
-
-        `tf.constant <https://www.tensorflow.org/api_docs/python/tf/constant>`_
+        Converts the initial_conditions (or model_parameters) into the
+        float64 ndarray fed to the placeholders of the compiled graph.
 
         Parameters
         ----------
@@ -34,20 +125,54 @@ class Model:
 
         Returns
         -------
-        tf.constant
-            Constant tf.float64 n-d tensor based on initial_conditions
-            provided.
+        np.ndarray
+            float64 ndarray based on the values provided.
 
         """
-        init_state = tf.constant(arg1, dtype=tf.float64)
+        init_state = np.asarray(arg1, dtype=np.float64)
         return init_state
 
-    def ode_solver(self, arg1: tf.stack, arg2: np.ndarray) -> list:
+    def time_array(self, start: int = 0, stop: int = None) -> np.ndarray:
+        """Time array.
+
+        Slices of the grid are computed directly, so a chunk of a very
+        long grid never materializes the whole of it.
+
+        Parameters
+        ----------
+        start
+            Index of the first time point.
+        stop
+            Index one past the last time point, defaults to time_steps.
+
+        Returns
+        -------
+        np.ndarray
+            Points start to stop of the time_steps evenly spaced time
+            points from 0 to final_time, matching np.linspace.
+
+        """
+        stop = self.time_steps if stop is None else stop
+        step = self.final_time / (self.time_steps - 1) if self.time_steps > 1 else 0
+        t = np.arange(start, stop) * step
+        if stop == self.time_steps and stop > max(start, 1):
+            t[-1] = self.final_time
+        return t
+
+    def components(self) -> dict:
+        """Index of each named state component, or slice for a block of them, see fizzpy.solution.Solution."""
+        return {name: index for index, name in enumerate(self.state_names)}
+
+    def wrap(self, arg1: np.ndarray) -> Solution:
+        """View of a solved [d, T] or [N, d, T] array as a Solution with this model's names and time grid."""
+        return Solution(arg1, self.components(), self.final_time, self.time_steps)
+
+    def ode_solver(self, arg1: 'tf.stack', arg2: 'tf.placeholder') -> list:
         """Ordinary Differential Equation (ODE) solver.
 
-        Uses Tensorflow/Numpy odeint to numerically solve the input system
-        of ODEs given the provided initial conditions and optional time
-        array parameters.
+        Uses Tensorflow odeint to build the graph that numerically solves
+        the input system of ODEs from the provided initial conditions
+        placeholder over the model's time array.
 
         `odeint <https://www.tensorflow.org/api_docs/python/tf/contrib/integrate/odeint>`_
 
@@ -56,7 +181,7 @@ class Model:
         arg1
             Tensorflow stack representing the equations for the system of ODEs.
         arg2
-            Initial conditions for the system of ODEs to be solved.
+            Initial conditions placeholder for the system of ODEs to be solved.
 
         Returns
         -------
@@ -66,23 +191,112 @@ class Model:
             info_dict: only if full_output=True for odeint, additional info.
 
         """
-        t = np.linspace(0, self.final_time, num=self.time_steps)
-        tensor_state, tensor_info = tf.contrib.integrate.odeint(arg1, self.init_converter(arg2), t, full_output=True)
+        tf = tensorflow()
+        t = self.time_array()
+        tensor_state, tensor_info = tf.contrib.integrate.odeint(arg1, arg2, t, full_output=True)
         return [tensor_state, tensor_info]
 
-    def tf_session(self, arg1: tf.stack, arg2: np.ndarray) -> np.ndarray:
+    def graph_key(self, arg1: np.ndarray, batch: bool = False, dtype=np.float64) -> tuple:
+        """Compiled graph key.
+
+        Graphs are shared between every instance of a model class with the
+        same state dimension, time grid and dtype.
+
+        Parameters
+        ----------
+        arg1
+            Initial conditions for the system of ODEs to be solved, either
+            a single state or one state per row.
+        batch
+            Whether the graph integrates a batch of trajectories.
+        dtype
+            Floating point type of the graph's state and parameters.
+
+        Returns
+        -------
+        tuple
+            Model class, state dimension, final_time, time_steps, batch and dtype.
+
+        """
+        return type(self), np.shape(arg1)[-1], self.final_time, self.time_steps, batch, np.dtype(dtype).name
+
+    def compile(self, arg1: 'tf.stack', arg2: np.ndarray, batch: bool = False, dtype=np.float64) -> CompiledGraph:
+        """Compile.
+
+        Builds the odeint graph and its session the first time a model class,
+        state dimension and time grid is solved, then reuses it. Initial
+        conditions and model parameters are placeholders, so nothing about
+        a particular instance is baked into the graph.
+
+        Batched graphs carry the state as a [d, N] tensor and the parameters
+        as a [p, N] tensor, so the equations unstack into length N vectors
+        and all N trajectories are integrated by one odeint call.
+
+        `tf.placeholder <https://www.tensorflow.org/api_docs/python/tf/placeholder>`_
+
+        Parameters
+        ----------
+        arg1
+            Equations for the system of ODEs, called as arg1(state, t, p, ops).
+        arg2
+            Initial conditions for the system of ODEs to be solved.
+        batch
+            Whether to build the graph for a batch of trajectories.
+        dtype
+            Floating point type of the state and parameters, float64 or
+            float32. Fed values are converted to it.
+
+        Returns
+        -------
+        CompiledGraph
+            The cached graph and session for this model.
+
+        """
+        key = self.graph_key(arg2, batch, dtype)
+        with Model.compile_lock:
+            compiled = Model.compiled_graphs.get(key)
+            if compiled is None:
+                tf = tensorflow()
+                dimension = np.shape(arg2)[-1]
+                state_shape, parameters_shape = ([dimension, None], [None, None]) if batch else ([dimension], [None])
+                graph = tf.Graph()
+                with graph.as_default():
+                    init_state = tf.placeholder(tf.as_dtype(dtype), shape=state_shape, name='initial_conditions')
+                    parameters = tf.placeholder(tf.as_dtype(dtype), shape=parameters_shape, name='model_parameters')
+                    fetches = self.ode_solver(lambda state, t: arg1(state, t, parameters, TensorflowOps), init_state)
+                compiled = CompiledGraph(graph, tf.Session(graph=graph), init_state, parameters, fetches)
+                Model.compiled_graphs[key] = compiled
+        return compiled
+
+    @classmethod
+    def close_sessions(cls):
+        """Close sessions.
+
+        Closes every cached session and drops the compiled graphs, the next
+        solve builds them again. Registered to run at interpreter exit.
+
+        """
+        with Model.compile_lock:
+            while Model.compiled_graphs:
+                _, compiled = Model.compiled_graphs.popitem()
+                compiled.close()
+
+    def tf_session(self, arg1: 'tf.stack', arg2: np.ndarray, dtype=np.float64) -> np.ndarray:
         """Tensorflow session runner.
 
-        Uses a Tensorflow session run to evaluate the provided system of ODEs.
+        Runs the compiled graph for this model in its cached Tensorflow session,
+        feeding the provided initial conditions and the model parameters.
 
         `tf.Session.run <https://www.tensorflow.org/api_docs/python/tf/Session#run>`_
 
         Parameters
         ----------
         arg1
-            Tensorflow stack representing the equations for the system of ODEs.
+            Equations for the system of ODEs, called as arg1(state, t, p, ops).
         arg2
             Initial conditions for the system of ODEs to be solved.
+        dtype
+            Floating point type of the graph, float64 or float32.
 
         Returns
         -------
@@ -91,31 +305,1244 @@ class Model:
             ode_solver after it's been solved in the Tensorflow session.
 
         """
-        sess = tf.Session()
-        state, info = sess.run(self.ode_solver(arg1, arg2))
+        stats = self.new_stats('tensorflow')
+        started = time.perf_counter()
+        compiled = self.compile(arg1, arg2, dtype=dtype)
+        run_started = time.perf_counter()
+        state, info = compiled.run(self.init_converter(arg2), self.init_converter(self.model_parameters))
         output = state.T
+        stats.graph_build_time = run_started - started
+        stats.integrate_time = time.perf_counter() - run_started
+        stats.session_time = time.perf_counter() - started
+        stats.update(info)
+        self.stats = stats
         return output
 
-    def solve(self):
-        """Solve
+    def numpy_session(self, arg1, arg2: np.ndarray, solver=None, **options) -> np.ndarray:
+        """NumPy session runner.
 
-        Solves the provided equations in a Tensorflow session with either the provided
-        or the default initial conditions.
+        Solves the provided system of ODEs with the NumPy backend, without
+        touching Tensorflow. Output matches tf_session.
 
         Parameters
         ----------
-        self
-            Current instance state.
+        arg1
+            Equations for the system of ODEs, called as arg1(state, t, p, ops).
+        arg2
+            Initial conditions for the system of ODEs to be solved.
+        solver
+            'odeint' (SciPy LSODA, the default), 'dopri5', 'rosenbrock' or 'radau'.
+        options
+            Solver keyword arguments, e.g. rtol and atol.
 
         Returns
         -------
         np.ndarray
-            Returns the solution from the Tensorflow session.
+            Solution of shape [d, T].
 
         """
-        self.solution = self.tf_session(self.equations, self.initial_conditions)
+        stats = self.new_stats('numpy', solver)
+        started = time.perf_counter()
+        if solver is None or solver == 'odeint':
+            state, info = numpy_solver(arg1, self.init_converter(arg2), self.init_converter(self.model_parameters),
+                                       self.time_array(), solver, self.jacobian, **options)
+        else:
+            # Kept for extend, which carries on stepping it
+            self.integrator = numpy_integrator(arg1, self.init_converter(arg2),
+                                               self.init_converter(self.model_parameters), 0., self.final_time,
+                                               solver, self.jacobian, **options)
+            state, info = integrate(self.integrator, self.time_array()), self.integrator.info()
+        output = state.T
+        stats.integrate_time = stats.session_time = time.perf_counter() - started
+        stats.update(info)
+        self.stats = stats
+        return output
+
+    def numba_session(self, arg1, arg2: np.ndarray, solver='rk4', substeps: int = 1, dtype=np.float64) -> np.ndarray:
+        """Numba session runner.
+
+        Solves the model with a fixed step integrator compiled by Numba,
+        see fizzpy.jit. The model's compiled equations are used in place of
+        arg1. Output matches tf_session.
+
+        Parameters
+        ----------
+        arg1
+            Equations for the system of ODEs, unused.
+        arg2
+            Initial conditions for the system of ODEs to be solved.
+        solver
+            'euler', 'rk2' or 'rk4'.
+        substeps
+            Fixed steps taken per interval of the time array.
+        dtype
+            Floating point type of the solution, float64 or float32.
+
+        Returns
+        -------
+        np.ndarray
+            Solution of shape [d, T].
+
+        """
+        output = self.numba_batch_session(arg1, self.init_converter(arg2)[None],
+                                          self.init_converter(self.model_parameters)[None], solver, substeps, dtype)
+        self.stats.batch = 1
+        return output[0]
+
+    def numba_batch_session(self, arg1, arg2: np.ndarray, arg3: np.ndarray, solver='rk4',
+                            substeps: int = 1, dtype=np.float64) -> np.ndarray:
+        """Numba batch session runner.
+
+        Parameters
+        ----------
+        arg1
+            Equations for the system of ODEs, unused.
+        arg2
+            Initial conditions, shape [N, d].
+        arg3
+            Model parameters, shape [N, p].
+        solver
+            'euler', 'rk2' or 'rk4'.
+        substeps
+            Fixed steps taken per interval of the time array.
+        dtype
+            Floating point type of the solutions, float64 or float32.
+
+        Returns
+        -------
+        np.ndarray
+            Solutions of shape [N, d, T].
+
+        """
+        stats = self.new_stats('numba', solver, len(arg2))
+        started = time.perf_counter()
+        output, info = numba_backend().solve(self, arg2, arg3, self.time_array(), solver, substeps, dtype)
+        stats.integrate_time = stats.session_time = time.perf_counter() - started
+        stats.update(info)
+        self.stats = stats
+        return output
+
+    def backend_name(self, backend=None, solver=None, options=None) -> str:
+        """Name of the backend a solve with these arguments runs on."""
+        if backend is None:
+            if solver in JIT_SOLVERS:
+                backend = 'numba'
+            else:
+                # dtype applies to every backend, other options select NumPy
+                backend = 'numpy' if solver is not None or set(options or ()) - {'dtype'} else self.backend
+        return backend
+
+    def solver_name(self, backend: str, solver=None) -> str:
+        """Name of the solver a solve on backend runs, resolving the defaults."""
+        if backend == 'tensorflow':
+            return 'dopri5'
+        elif backend == 'numba' and solver is None:
+            return 'rk4'
+        elif solver is None:
+            return self.solver or 'odeint'
+        return solver
+
+    def new_stats(self, backend: str, solver=None, batch: int = 1) -> profiling.SolveStats:
+        """Empty fizzpy.profiling.SolveStats for a solve of this model."""
+        return profiling.SolveStats(type(self).__name__, backend, self.solver_name(backend, solver), batch,
+                                    self.time_steps)
+
+    def record_stats(self, stats: profiling.SolveStats, started: float):
+        """Finish the stats of a solve started at started, keep them as self.stats and pass them to the hooks."""
+        stats.total_time = time.perf_counter() - started
+        self.stats = stats
+        profiling.emit(stats)
+
+    def cache_key(self, backend=None, solver=None, options=None) -> tuple:
+        """Cache key.
+
+        Parameters
+        ----------
+        backend
+            Backend of the solve.
+        solver
+            Solver of the solve, None for the model's default.
+        options
+            Solver keyword arguments of the solve.
+
+        Returns
+        -------
+        tuple
+            Everything that determines the solution: model class, model
+            parameters, initial conditions, time grid, backend, solver and
+            solver options, with the backend and solver defaults resolved.
+
+        """
+        backend = self.backend_name(backend, solver, options)
+        return (type(self).__module__, type(self).__qualname__, self.init_converter(self.model_parameters),
+                self.init_converter(self.initial_conditions), self.final_time, self.time_steps,
+                backend, self.solver_name(backend, solver), sorted((options or {}).items()))
+
+    def session(self, backend=None, solver=None, **options):
+        """Session selector.
+
+        Passing a solver, or solver options, selects the NumPy backend
+        unless Tensorflow is asked for explicitly, which is an error since
+        the Tensorflow graph always uses its own odeint. dtype is the one
+        option every backend takes.
+
+        Parameters
+        ----------
+        backend
+            'tensorflow', 'numpy' or 'numba', defaults to the model's backend.
+        solver
+            NumPy solver, 'odeint', 'dopri5', 'rosenbrock' or 'radau', or numba
+            solver, 'euler', 'rk2' or 'rk4'.
+        options
+            Solver keyword arguments, e.g. rtol and atol, or substeps for
+            the numba solvers, and dtype, float64 or float32, for all.
+
+        Returns
+        -------
+        tuple
+            The single and batch session runners for the backend.
+
+        """
+        backend = self.backend_name(backend, solver, options)
+        if backend == 'tensorflow':
+            if solver is not None or set(options) - {'dtype'}:
+                raise ValueError('Solver selection and options do not apply to the tensorflow backend.')
+            return functools.partial(self.tf_session, **options), functools.partial(self.tf_batch_session, **options)
+        elif backend == 'numpy':
+            solver = self.solver if solver is None else solver
+            return (functools.partial(self.numpy_session, solver=solver, **options),
+                    functools.partial(self.numpy_batch_session, solver=solver, **options))
+        elif backend == 'numba':
+            solver = 'rk4' if solver is None else solver
+            return (functools.partial(self.numba_session, solver=solver, **options),
+                    functools.partial(self.numba_batch_session, solver=solver, **options))
+        raise ValueError("Unknown backend %r, expected 'tensorflow', 'numpy' or 'numba'." % backend)
+
+    def output_converter(self, arg1: np.ndarray) -> np.ndarray:
+        """Output converter.
+
+        Converts a solved [d, ...] block, in place, into the model's output
+        convention. Identity by default.
+
+        Parameters
+        ----------
+        arg1
+            Solution with the state components along the first axis.
+
+        Returns
+        -------
+        np.ndarray
+            The converted solution, the same array as arg1.
+
+        """
+        return arg1
+
+    def output_allocator(self, shape: tuple, output_path=None, dtype=np.float64) -> np.ndarray:
+        """Output allocator.
+
+        Allocates the array a solution is written into. With an output path
+        this is a .npy file opened as a memmap, stored in Fortran order so
+        that the [..., T] array is laid out time-major on disk and each
+        solved chunk is written as one contiguous block. np.load(path,
+        mmap_mode='r') maps it back with the same shape.
+
+        Parameters
+        ----------
+        shape
+            Shape of the solution, [d, T] or [N, d, T].
+        output_path
+            Optional path of the .npy file to create.
+        dtype
+            Floating point type of the solution.
+
+        Returns
+        -------
+        np.ndarray
+            Array or memmap of the given shape.
+
+        """
+        if output_path is None:
+            return np.empty(shape[::-1], dtype).T
+        return np.lib.format.open_memmap(output_path, mode='w+', dtype=dtype, shape=shape, fortran_order=True)
+
+    def solve(self, backend=None, solver=None, out=None, output_path=None, chunk_steps=10000, cache=None,
+              reductions=None, checkpoint=None, **options) -> Solution:
+        """Solve
+
+        Solves the provided equations in a Tensorflow session, or with the NumPy
+        backend, with either the provided or the default initial conditions.
+
+        With out or output_path the solution is streamed into that array or
+        .npy file chunk by chunk as integration proceeds, so results larger
+        than memory can be produced and mapped back without reloading.
+
+        Parameters
+        ----------
+        backend
+            'tensorflow', 'numpy' or 'numba', defaults to the model's backend attribute,
+            'tensorflow' for most models. Tensorflow is an optional dependency,
+            installed with the tensorflow extra (pip install fizzpy[tensorflow]),
+            without it pass backend='numpy'.
+        solver
+            NumPy solver: 'odeint' (SciPy LSODA), 'dopri5' (adaptive
+            Dormand-Prince with dense output), 'rosenbrock' (stiff,
+            linearly implicit, 2nd order, for loose tolerances) or 'radau'
+            (stiff, implicit, 5th order, for tight ones); both use the
+            model's jacobian. Numba solver:
+            'euler', 'rk2' or 'rk4', fixed step and compiled, selecting
+            the numba backend; pass substeps for steps per output interval.
+        out
+            Optional [d, T] array, e.g. an np.memmap, to write the solution into.
+        output_path
+            Optional path of a .npy file to write the solution into.
+        chunk_steps
+            Time points solved per chunk when writing to out or output_path.
+        cache
+            Optional fizzpy.cache.SolutionCache, defaults to the model's
+            cache attribute. Hits are returned as read-only memmaps.
+        reductions
+            Optional list of fizzpy.reductions.Reduction. The solution is
+            streamed through them chunk by chunk with the NumPy backend and
+            only their results are returned, the trajectory is not kept.
+        checkpoint
+            Optional fizzpy.checkpoint.Checkpoint, or its directory, to
+            solve into chunk by chunk with the NumPy backend, saving progress
+            as it goes. Solving again with the same arguments and checkpoint
+            resumes an interrupted solve, or returns the finished one.
+        options
+            Solver keyword arguments, e.g. rtol, atol and max_step, and
+            dtype, float64 or float32, see solve_batch and precision_drift.
+
+        Returns
+        -------
+        Solution
+            Returns the solution from the selected backend, a view of out or
+            a memmap of output_path or the checkpoint's output when given, as a fizzpy.solution.Solution
+            with named state components and a lazy time axis. With reductions, the list of
+            their results instead. The solve's fizzpy.profiling.SolveStats
+            are kept as self.stats.
+
+        """
+        started = time.perf_counter()
+        self.continuation = self.integrator = None
+        if reductions is not None:
+            if backend not in (None, 'numpy'):
+                raise ValueError('Reductions require the numpy backend.')
+            results = self.reduce(self.init_converter(self.initial_conditions),
+                                  self.init_converter(self.model_parameters), reductions, chunk_steps, solver,
+                                  **options)
+            self.record_stats(self.stats, started)
+            return results
+        cache = self.cache if cache is None else cache
+        if out is None and output_path is None and checkpoint is None:
+            key = None if cache is None else cache.key(*self.cache_key(backend, solver, options))
+            solution = None if key is None else cache.get(key)
+            if solution is None:
+                session, _ = self.session(backend, solver, **options)
+                solution = session(self.equations, self.initial_conditions)
+                self.continuation = Continuation(self.backend_name(backend, solver, options), solver, options,
+                                                 self.final_time, solution[:, -1].copy(), self.integrator)
+                solution = self.output_converter(solution)
+                if key is not None:
+                    cache.put(key, solution)
+            else:
+                self.stats = self.new_stats(self.backend_name(backend, solver, options), solver)
+                self.stats.cache_hit = True
+            self.solution = self.wrap(solution)
+            self.record_stats(self.stats, started)
+            return self.solution
+        if backend not in (None, 'numpy'):
+            raise ValueError('Writing to out, output_path or a checkpoint requires the numpy backend.')
+        shape = (np.size(self.initial_conditions), self.time_steps)
+        if checkpoint is not None:
+            if out is not None or output_path is not None:
+                raise ValueError('A checkpointed solve is written to the checkpoint, not to out or output_path.')
+            checkpoint = self.open_checkpoint(checkpoint, shape, solver, options, chunk_steps,
+                                              dtype=options.get('dtype', np.float64))
+            out = checkpoint.output
+        out = self.output_allocator(shape, output_path, options.get('dtype', np.float64)) if out is None else out
+        if out.shape != shape:
+            raise ValueError('out has shape %s, expected %s.' % (out.shape, shape))
+        start = 0 if checkpoint is None else checkpoint.done
+        for t, state in self.iter_solve(chunk_steps, solver, checkpoint, **options):
+            out[:, start:start + len(t)] = state
+            start += len(t)
+        if isinstance(out, np.memmap):
+            out.flush()
+        if self.continuation is not None:
+            self.continuation.stored = True
+            self.continuation.path = out.filename if isinstance(out, np.memmap) else None
+        # iter_solve recorded the stats
+        self.solution = self.wrap(out)
         return self.solution
 
+    def extend(self, extra_time: float, out=None, output_path=None, chunk_steps=10000) -> Solution:
+        """Extend
+
+        Continues the last solve past final_time, from the state it stopped
+        at, instead of solving again from t=0, so a growing horizon costs
+        only the time added. NumPy integrators keep stepping with their
+        step size and internals; SciPy odeint and the numba backend restart
+        from the last state, as numpy_chunks does between chunks. Tensorflow
+        solves are continued with the NumPy dopri5 integrator, the method of
+        Tensorflow's odeint.
+
+        The output grid keeps its spacing, so extra_time is rounded to a
+        whole number of output steps. final_time and time_steps grow to
+        match, and the new points are appended to self.solution, in a
+        buffer grown geometrically so repeated extends copy the earlier
+        points only O(log) times. With out or output_path only the new
+        points are written there, chunk by chunk, and returned. So are
+        they when the last solve was streamed: after iter_solve, which
+        keeps no solution, only the new points are returned, and after a
+        solve into a .npy file they are written to a new one next to it,
+        e.g. run.501-600.npy for time points 501 to 600 of run.npy.
+
+        Parameters
+        ----------
+        extra_time
+            Time to continue for.
+        out
+            Optional [d, k] array, e.g. an np.memmap, to write the new points into.
+        output_path
+            Optional path of a .npy file to write the new points into.
+        chunk_steps
+            Time points solved per chunk when writing to out or output_path.
+
+        Returns
+        -------
+        Solution
+            The whole solution from t=0, or the new points when writing to
+            out or output_path or after a streamed solve.
+
+        """
+        continuation = self.__dict__.get('continuation')
+        if continuation is None:
+            raise ValueError('Nothing to extend, solve first; cache hits, batches and reductions keep no final '
+                             'state.')
+        started = time.perf_counter()
+        step = self.final_time / (self.time_steps - 1)
+        steps = int(round(extra_time / step))
+        if steps < 1:
+            raise ValueError('extra_time is shorter than one output step, %g.' % step)
+        t = self.final_time + step * np.arange(1, steps + 1)
+        stats = self.new_stats('numba' if continuation.backend == 'numba' else 'numpy',
+                               'dopri5' if continuation.backend == 'tensorflow' else continuation.solver)
+        if out is None and output_path is None and continuation.path is not None:
+            root, extension = os.path.splitext(continuation.path)
+            output_path = '%s.%d-%d%s' % (root, self.time_steps, self.time_steps + steps - 1, extension)
+        append = out is None and output_path is None and continuation.stored
+        if append:
+            segment = self.output_converter(self.continue_solve(continuation, t, stats).T)
+            size = self.solution.shape[-1]
+            buffer = self.__dict__.get('buffer')
+            if buffer is None or not np.may_share_memory(buffer, self.solution) or buffer.shape[1] < size + steps:
+                buffer = np.empty((len(segment), max(2 * size, size + steps)), self.solution.dtype)
+                buffer[:, :size] = self.solution
+                self.buffer = buffer
+            buffer[:, size:size + steps] = segment
+            result = buffer[:, :size + steps]
+        elif out is None and output_path is None:
+            result = self.output_converter(self.continue_solve(continuation, t, stats).T)
+        else:
+            shape = (len(continuation.y), steps)
+            dtype = continuation.options.get('dtype', np.float64)
+            out = self.output_allocator(shape, output_path, dtype) if out is None else out
+            if out.shape != shape:
+                raise ValueError('out has shape %s, expected %s.' % (out.shape, shape))
+            for start in range(0, steps, chunk_steps):
+                chunk = t[start:start + chunk_steps]
+                out[:, start:start + len(chunk)] = self.output_converter(
+                    self.continue_solve(continuation, chunk, stats).T)
+            if isinstance(out, np.memmap):
+                out.flush()
+            result = out
+        self.final_time, self.time_steps = t[-1], self.time_steps + steps
+        stats.time_steps = steps
+        stats.integrate_time = stats.session_time = time.perf_counter() - started
+        self.record_stats(stats, started)
+        if append:
+            self.solution = self.wrap(result)
+            return self.solution
+        return Solution(result, self.components())
+
+    def continue_solve(self, continuation: Continuation, t: np.ndarray, stats: profiling.SolveStats) -> np.ndarray:
+        """Solve from where continuation stopped through the time points t, advancing it.
+
+        Returns
+        -------
+        np.ndarray
+            Solution at each time point, shape [k, d], before output conversion.
+
+        """
+        parameters = self.init_converter(self.model_parameters)
+        options = dict(continuation.options)
+        if continuation.backend == 'numba':
+            output, info = numba_backend().solve(self, continuation.y[None], parameters[None],
+                                                 np.concatenate(([continuation.t], t)), continuation.solver or 'rk4',
+                                                 options.get('substeps', 1))
+            state = output[0].T[1:]
+        elif continuation.integrator is None and continuation.solver in (None, 'odeint') \
+                and continuation.backend == 'numpy':
+            state, info = numpy_solver(self.equations, continuation.y, parameters,
+                                       np.concatenate(([continuation.t], t)), continuation.solver, **options)
+            state = state[1:]
+        else:
+            if continuation.integrator is None:
+                solver = continuation.solver if continuation.backend == 'numpy' else 'dopri5'
+                continuation.integrator = numpy_integrator(self.equations, continuation.y, parameters,
+                                                           continuation.t, t[-1], solver, self.jacobian, **options)
+            integrator = continuation.integrator
+            before = integrator.info()
+            integrator.t_bound = t[-1]
+            state = integrate(integrator, t)
+            info = {name: value - before[name] for name, value in integrator.info().items()}
+        continuation.t, continuation.y = t[-1], state[-1].copy()
+        stats.add(info)
+        return state
+
+    async def solve_async(self, backend=None, solver=None, executor=None, **options):
+        """Solve async
+
+        Awaitable solve for asyncio applications, run on a bounded thread
+        pool so the event loop keeps serving other requests. With
+        coalesce=True it may be merged with concurrent solves of the same
+        configuration into one batch, see fizzpy.aio.SolveExecutor.
+
+        Parameters
+        ----------
+        backend
+            'tensorflow', 'numpy' or 'numba', see solve.
+        solver
+            Solver, see solve.
+        executor
+            fizzpy.aio.SolveExecutor, defaults to a shared one.
+        options
+            Keyword arguments of solve, and coalesce=True to allow batching with other solves.
+
+        Returns
+        -------
+        np.ndarray
+            The solution, also kept as self.solution.
+
+        """
+        from fizzpy import aio
+
+        executor = aio.default() if executor is None else executor
+        return await executor.solve(self, backend, solver, **options)
+
+    async def solve_batch_async(self, initial_conditions=None, model_parameters=None, backend=None, solver=None,
+                                executor=None, **options) -> np.ndarray:
+        """Solve batch async
+
+        Awaitable solve_batch, see solve_async.
+
+        Parameters
+        ----------
+        initial_conditions
+            Initial conditions, shape [d] or [N, d].
+        model_parameters
+            Model parameters, shape [p] or [N, p].
+        backend
+            'tensorflow', 'numpy' or 'numba', see solve_batch.
+        solver
+            Solver, see solve_batch.
+        executor
+            fizzpy.aio.SolveExecutor, defaults to a shared one.
+        options
+            Keyword arguments of solve_batch, and coalesce=True to allow batching with other solves.
+
+        Returns
+        -------
+        np.ndarray
+            Solutions of shape [N, d, T].
+
+        """
+        from fizzpy import aio
+
+        executor = aio.default() if executor is None else executor
+        return await executor.solve_batch(self, initial_conditions, model_parameters, backend, solver, **options)
+
+    def iter_solve(self, chunk_steps: int = 1000, solver=None, checkpoint=None, **options):
+        """Iterate solve
+
+        Solves the provided equations with the NumPy backend one chunk of the
+        time grid at a time, carrying the state across chunk boundaries. Peak
+        memory is bounded by chunk_steps rather than time_steps, and each
+        chunk can be processed as soon as it is solved. No solution is kept,
+        so extend afterwards returns only the new points. The stats are
+        recorded once the last chunk has been consumed.
+
+        Parameters
+        ----------
+        chunk_steps
+            Number of time points per chunk.
+        solver
+            NumPy solver, 'odeint', 'dopri5', 'rosenbrock' or 'radau'.
+        checkpoint
+            Optional opened fizzpy.checkpoint.Checkpoint, see iter_chunks.
+        options
+            Solver keyword arguments, e.g. rtol and atol.
+
+        Yields
+        ------
+        tuple
+            t: the chunk's time points, shape [k].
+            y: the solution over the chunk, shape [d, k].
+
+        """
+        started = time.perf_counter()
+        self.stats = self.new_stats('numpy', solver)
+        self.continuation = self.integrator = None
+        for t, state in self.iter_chunks(self.init_converter(self.initial_conditions),
+                                         self.init_converter(self.model_parameters), chunk_steps, solver, self.stats,
+                                         checkpoint, **options):
+            self.continuation = Continuation('numpy', solver, options, t[-1], state[-1].copy(), stored=False)
+            yield t, self.output_converter(state.T)
+        self.record_stats(self.stats, started)
+
+    def reduce(self, arg1: np.ndarray, arg2: np.ndarray, reductions: list, chunk_steps: int = 10000, solver=None,
+               **options) -> list:
+        """Reduce.
+
+        Streams the solution through the reductions one chunk at a time,
+        in the model's output convention, keeping only the current chunk.
+
+        Parameters
+        ----------
+        arg1
+            Initial conditions, shape [d] or [d, N].
+        arg2
+            Model parameters, shape [p] or [p, N].
+        reductions
+            List of fizzpy.reductions.Reduction.
+        chunk_steps
+            Number of time points per chunk.
+        solver
+            NumPy solver, 'odeint', 'dopri5', 'rosenbrock' or 'radau'.
+        options
+            Solver keyword arguments, e.g. rtol and atol.
+
+        Returns
+        -------
+        list
+            The result of each reduction, [d] or [N, d] shaped summaries.
+
+        """
+        for reduction in reductions:
+            reduction.reset()
+        self.stats = self.new_stats('numpy', solver, 1 if arg1.ndim == 1 else arg1.shape[1])
+        for t, state in self.iter_chunks(arg1, arg2, chunk_steps, solver, self.stats, **options):
+            self.output_converter(np.moveaxis(state, 1, 0))
+            chunk = state.transpose(0, 2, 1) if state.ndim == 3 else state
+            for reduction in reductions:
+                reduction.update(t, chunk)
+        return [reduction.result() for reduction in reductions]
+
+    def iter_chunks(self, arg1: np.ndarray, arg2: np.ndarray, chunk_steps: int, solver=None, stats=None,
+                    checkpoint=None, **options):
+        """Chunk iterator.
+
+        Parameters
+        ----------
+        arg1
+            Initial conditions, shape [d] or [d, N].
+        arg2
+            Model parameters, shape [p] or [p, N].
+        chunk_steps
+            Number of time points per chunk.
+        solver
+            NumPy solver, 'odeint', 'dopri5', 'rosenbrock' or 'radau'.
+        stats
+            Optional fizzpy.profiling.SolveStats to record the solver's
+            counters and time in.
+        checkpoint
+            Optional fizzpy.checkpoint.Checkpoint, opened with open_checkpoint.
+            Chunks start where it was last saved, and it is saved as they
+            are consumed, so each must be written to checkpoint.output
+            before the next is asked for.
+        options
+            Solver keyword arguments, e.g. rtol and atol.
+
+        Yields
+        ------
+        tuple
+            t: the chunk's time points, shape [k].
+            y: the solution over the chunk, shape [k, d] or [k, d, N].
+
+        """
+        bounds = range(0 if checkpoint is None else checkpoint.done, self.time_steps, chunk_steps)
+        chunks = (self.time_array(start, min(start + chunk_steps, self.time_steps)) for start in bounds)
+        solver = self.solver if solver is None else solver
+        return numpy_chunks(self.equations, arg1, arg2, chunks, self.final_time, solver, self.jacobian, stats,
+                            checkpoint, **options)
+
+    def open_checkpoint(self, checkpoint, shape: tuple, solver, options: dict, *parts, fortran_order: bool = True,
+                        dtype=np.float64) -> Checkpoint:
+        """Open checkpoint.
+
+        Parameters
+        ----------
+        checkpoint
+            fizzpy.checkpoint.Checkpoint, or its directory.
+        shape
+            Shape of the run's output.
+        solver
+            NumPy solver of the run.
+        options
+            Solver keyword arguments of the run.
+        parts
+            Anything else the run's output depends on, e.g. its chunk size
+            or batch, hashed with the model's cache_key.
+        fortran_order
+            Lay a new output out time-major, see fizzpy.checkpoint.Checkpoint.open.
+        dtype
+            Floating point type of the output.
+
+        Returns
+        -------
+        Checkpoint
+            The checkpoint, opened on this run, its output is checkpoint.output.
+
+        """
+        checkpoint = checkpoint if isinstance(checkpoint, Checkpoint) else Checkpoint(checkpoint)
+        checkpoint.open(digest(*self.cache_key('numpy', solver, options), *parts), shape, fortran_order, dtype)
+        return checkpoint
+
+    def solve_events(self, events=None, solver='dopri5', trajectory=False, xtol=1e-10, **options):
+        """Solve events
+
+        Solves the provided equations with a NumPy integrator and locates
+        events, threshold crossings of state components, by root finding on
+        the dense output of each step. By default no trajectory is stored,
+        so memory does not grow with final_time, only with the number of
+        events found.
+
+        Parameters
+        ----------
+        events
+            List of fizzpy.integrators.Event, defaults to rising crossings
+            of spike_threshold by the first component.
+        solver
+            NumPy integrator with dense output, 'dopri5', 'rosenbrock' or 'radau'.
+        trajectory
+            Also sample and return the solution on the time grid.
+        xtol
+            Tolerance on the located event times.
+        options
+            Solver keyword arguments, e.g. rtol and atol.
+
+        Returns
+        -------
+        list
+            For each event, its times [k] and the states [k, d] at them, in
+            the model's output convention. With trajectory, a tuple of that
+            list and the [d, T] solution.
+
+        """
+        if events is None:
+            if self.spike_threshold is None:
+                raise ValueError('%s has no spike_threshold, pass events explicitly.' % type(self).__name__)
+            events = [Event(0, self.spike_threshold, 1)]
+        if solver is None or solver == 'odeint':
+            raise ValueError('Locating events needs an integrator with dense output, e.g. dopri5 or rosenbrock.')
+        started = time.perf_counter()
+        stats = self.new_stats('numpy', solver)
+        self.continuation = self.integrator = None
+        integrator = numpy_integrator(self.equations, self.init_converter(self.initial_conditions),
+                                      self.init_converter(self.model_parameters), 0., self.final_time, solver,
+                                      self.jacobian, **options)
+        locator = EventLocator(integrator, events, self.output_converter, xtol)
+        if not trajectory:
+            advance(integrator, self.final_time, locator)
+        else:
+            self.solution = self.output_converter(integrate(integrator, self.time_array(), on_step=locator).T)
+        stats.integrate_time = stats.session_time = time.perf_counter() - started
+        stats.update(integrator.info())
+        self.record_stats(stats, started)
+        if not trajectory:
+            return locator.results()
+        return locator.results(), self.solution
+
+    def spikes(self, threshold=None, solver='dopri5', **options) -> np.ndarray:
+        """Spikes
+
+        Spike times of the first state component, found as rising crossings
+        of threshold without storing the trajectory.
+
+        Parameters
+        ----------
+        threshold
+            Spike threshold, defaults to the model's spike_threshold.
+        solver
+            NumPy integrator with dense output, 'dopri5', 'rosenbrock' or 'radau'.
+        options
+            Solver keyword arguments, e.g. rtol and atol.
+
+        Returns
+        -------
+        np.ndarray
+            Spike times.
+
+        """
+        threshold = self.spike_threshold if threshold is None else threshold
+        (times, _), = self.solve_events([Event(0, threshold, 1)], solver, **options)
+        return times
+
+    def batch_converter(self, arg1: np.ndarray, arg2: np.ndarray) -> list:
+        """Batch converter.
+
+        Broadcasts initial conditions and model parameters against each
+        other so either can be given once for the whole batch.
+
+        Parameters
+        ----------
+        arg1
+            Initial conditions, shape [d] or [N, d].
+        arg2
+            Model parameters, shape [p] or [N, p].
+
+        Returns
+        -------
+        list
+            float64 initial conditions [N, d] and model parameters [N, p].
+
+        """
+        init_states = np.atleast_2d(self.init_converter(arg1))
+        parameters = np.atleast_2d(self.init_converter(arg2))
+        batch_size = max(len(init_states), len(parameters))
+        init_states = np.broadcast_to(init_states, (batch_size, init_states.shape[1]))
+        parameters = np.broadcast_to(parameters, (batch_size, parameters.shape[1]))
+        return [init_states, parameters]
+
+    def tf_batch_session(self, arg1: 'tf.stack', arg2: np.ndarray, arg3: np.ndarray, dtype=np.float64) -> np.ndarray:
+        """Tensorflow batch session runner.
+
+        Runs the compiled batch graph for this model, integrating every row
+        of the initial conditions with the matching row of the parameters
+        in a single odeint call.
+
+        Parameters
+        ----------
+        arg1
+            Equations for the system of ODEs, called as arg1(state, t, p, ops).
+        arg2
+            Initial conditions, shape [N, d].
+        arg3
+            Model parameters, shape [N, p].
+        dtype
+            Floating point type of the graph, float64 or float32.
+
+        Returns
+        -------
+        np.ndarray
+            Solutions of shape [N, d, T].
+
+        """
+        stats = self.new_stats('tensorflow', batch=len(arg2))
+        started = time.perf_counter()
+        compiled = self.compile(arg1, arg2, batch=True, dtype=dtype)
+        run_started = time.perf_counter()
+        state, info = compiled.run(arg2.T, arg3.T)
+        output = np.transpose(state, (2, 1, 0))
+        stats.graph_build_time = run_started - started
+        stats.integrate_time = time.perf_counter() - run_started
+        stats.session_time = time.perf_counter() - started
+        stats.update(info)
+        self.stats = stats
+        return output
+
+    def numpy_batch_session(self, arg1, arg2: np.ndarray, arg3: np.ndarray, solver=None, **options) -> np.ndarray:
+        """NumPy batch session runner.
+
+        Parameters
+        ----------
+        arg1
+            Equations for the system of ODEs, called as arg1(state, t, p, ops).
+        arg2
+            Initial conditions, shape [N, d].
+        arg3
+            Model parameters, shape [N, p].
+        solver
+            'odeint' (SciPy LSODA, the default), 'dopri5', 'rosenbrock' or 'radau'.
+        options
+            Solver keyword arguments, e.g. rtol and atol.
+
+        Returns
+        -------
+        np.ndarray
+            Solutions of shape [N, d, T].
+
+        """
+        stats = self.new_stats('numpy', solver, len(arg2))
+        started = time.perf_counter()
+        state, info = numpy_solver(arg1, np.ascontiguousarray(arg2.T), np.ascontiguousarray(arg3.T),
+                                   self.time_array(), solver, self.jacobian, **options)
+        output = np.transpose(state, (2, 1, 0))
+        stats.integrate_time = stats.session_time = time.perf_counter() - started
+        stats.update(info)
+        self.stats = stats
+        return output
+
+    def solve_batch(self, initial_conditions=None, model_parameters=None, backend=None, solver=None, out=None,
+                    output_path=None, chunk_steps=10000, reductions=None, checkpoint=None, drift_sample=None,
+                    **options) -> Solution:
+        """Solve batch
+
+        Solves the provided equations for N trajectories at once, one per row
+        of initial conditions and model parameters. Either may be given as a
+        single row, in which case it is shared by the whole batch, and both
+        default to the instance's own values.
+
+        Parameters
+        ----------
+        initial_conditions
+            Initial conditions, shape [d] or [N, d].
+        model_parameters
+            Model parameters, shape [p] or [N, p].
+        backend
+            'tensorflow', 'numpy' or 'numba', defaults to the model's backend attribute.
+        solver
+            NumPy solver, see solve.
+        out
+            Optional [N, d, T] array, e.g. an np.memmap, to write the solutions into.
+        output_path
+            Optional path of a .npy file to write the solutions into.
+        chunk_steps
+            Time points solved per chunk when writing to out or output_path.
+        reductions
+            Optional list of fizzpy.reductions.Reduction, see solve. Results
+            are [N, d] shaped.
+        checkpoint
+            Optional fizzpy.checkpoint.Checkpoint, or its directory, see solve.
+        drift_sample
+            Trajectories of a batch solved with dtype float32 to solve
+            again in float64, defaults to the model's drift_sample. Their
+            drift is reported as self.stats.drift, see precision_drift.
+            0 skips it.
+        options
+            Solver keyword arguments, e.g. rtol and atol, and dtype,
+            float64 or float32. float32 halves the memory of the
+            solutions, and with the NumPy solvers speeds up large batches.
+
+        Returns
+        -------
+        Solution
+            Solutions of shape [N, d, T], a view of out or a memmap of
+            output_path when given, as a fizzpy.solution.Solution. With reductions, the list of their
+            results instead. The solve's fizzpy.profiling.SolveStats are
+            kept as self.stats.
+
+        """
+        started = time.perf_counter()
+        if initial_conditions is None:
+            initial_conditions = self.initial_conditions
+        if model_parameters is None:
+            model_parameters = self.model_parameters
+        init_states, parameters = self.batch_converter(initial_conditions, model_parameters)
+        self.continuation = self.integrator = None
+        if reductions is not None:
+            if backend not in (None, 'numpy'):
+                raise ValueError('Reductions require the numpy backend.')
+            results = self.reduce(np.ascontiguousarray(init_states.T), np.ascontiguousarray(parameters.T),
+                                  reductions, chunk_steps, solver, **options)
+            self.record_stats(self.stats, started)
+            return results
+        if out is None and output_path is None and checkpoint is None:
+            _, batch_session = self.session(backend, solver, **options)
+            solution = batch_session(self.equations, init_states, parameters)
+            self.output_converter(solution.transpose(1, 0, 2))
+            self.stats.drift = self.monitor_drift(solution, init_states, parameters, backend, solver, drift_sample,
+                                                  options)
+            self.record_stats(self.stats, started)
+            return self.wrap(solution)
+        if backend not in (None, 'numpy'):
+            raise ValueError('Writing to out, output_path or a checkpoint requires the numpy backend.')
+        shape = init_states.shape + (self.time_steps,)
+        if checkpoint is not None:
+            if out is not None or output_path is not None:
+                raise ValueError('A checkpointed solve is written to the checkpoint, not to out or output_path.')
+            checkpoint = self.open_checkpoint(checkpoint, shape, solver, options, chunk_steps, init_states, parameters,
+                                              dtype=options.get('dtype', np.float64))
+            out = checkpoint.output
+        out = self.output_allocator(shape, output_path, options.get('dtype', np.float64)) if out is None else out
+        if out.shape != shape:
+            raise ValueError('out has shape %s, expected %s.' % (out.shape, shape))
+        stats = self.new_stats('numpy', solver, len(init_states))
+        start = 0 if checkpoint is None else checkpoint.done
+        for t, state in self.iter_chunks(np.ascontiguousarray(init_states.T), np.ascontiguousarray(parameters.T),
+                                         chunk_steps, solver, stats, checkpoint, **options):
+            block = out[:, :, start:start + len(t)]
+            block[...] = state.T
+            self.output_converter(block.transpose(1, 0, 2))
+            start += len(t)
+        if isinstance(out, np.memmap):
+            out.flush()
+        stats.drift = self.monitor_drift(out, init_states, parameters, backend, solver, drift_sample, options)
+        self.record_stats(stats, started)
+        return self.wrap(out)
+
+    def monitor_drift(self, arg1: np.ndarray, arg2: np.ndarray, arg3: np.ndarray, backend, solver, sample,
+                      options: dict) -> dict:
+        """Drift of a batch solved in reduced precision on a sample of its trajectories, None for float64 batches."""
+        sample = self.drift_sample if sample is None else sample
+        if np.dtype(options.get('dtype', np.float64)) == np.float64 or not sample:
+            return None
+        return self.precision_drift(arg1, arg2, arg3, backend, solver, sample, **options)
+
+    def precision_drift(self, solutions, initial_conditions=None, model_parameters=None, backend=None, solver=None,
+                        sample=None, seed=0, **options) -> dict:
+        """Precision drift
+
+        Solves a random sample of the trajectories of reduced precision
+        solutions again in float64, with the same backend, solver and
+        options, and compares them, see fizzpy.profiling.drift. Batches
+        solved with dtype float32 report this as their stats.drift; call
+        it on the results of solve or sweep to check those.
+
+        Parameters
+        ----------
+        solutions
+            Solutions of shape [N, d, T], or [d, T] for one trajectory.
+        initial_conditions
+            Initial conditions they were solved from, shape [d] or [N, d],
+            defaults to the model's.
+        model_parameters
+            Model parameters they were solved with, shape [p] or [N, p],
+            defaults to the model's.
+        backend
+            Backend they were solved with, see solve.
+        solver
+            Solver they were solved with, see solve.
+        sample
+            Number of trajectories to compare, defaults to the model's drift_sample.
+        seed
+            Seed of the sample.
+        options
+            Solver keyword arguments they were solved with. dtype and
+            error_dtype are dropped for the float64 solve.
+
+        Returns
+        -------
+        dict
+            The drift report of fizzpy.profiling.drift.
+
+        """
+        if initial_conditions is None:
+            initial_conditions = self.initial_conditions
+        if model_parameters is None:
+            model_parameters = self.model_parameters
+        solutions = np.asarray(solutions)
+        solutions = solutions[None] if solutions.ndim == 2 else solutions
+        init_states, parameters = self.batch_converter(initial_conditions, model_parameters)
+        if len(init_states) != len(solutions):
+            raise ValueError('%d solutions for %d initial conditions and parameters.' % (len(solutions),
+                                                                                       len(init_states)))
+        sample = self.drift_sample if sample is None else sample
+        rows = np.sort(np.random.default_rng(seed).choice(len(solutions), min(sample, len(solutions)), replace=False))
+        # Backend chosen with the reduced precision options, so the float64 solve runs on the same one
+        backend = self.backend_name(backend, solver, options)
+        options = {name: value for name, value in options.items() if name not in ('dtype', 'error_dtype')}
+        stats = self.__dict__.get('stats')
+        try:
+            _, batch_session = self.session(backend, solver, **options)
+            reference = batch_session(self.equations, init_states[rows], parameters[rows])
+            self.output_converter(reference.transpose(1, 0, 2))
+        finally:
+            self.stats = stats
+        return profiling.drift(solutions[rows], reference, rows)
+
+    def lyapunov(self, initial_conditions=None, model_parameters=None, duration=None, interval=1., transient=0.,
+                 solver='dopri5', **options) -> np.ndarray:
+        """Lyapunov spectrum
+
+        Estimates the Lyapunov exponents by integrating the tangent-linear
+        system alongside the state, with QR re-orthonormalization every
+        interval, see fizzpy.lyapunov.spectrum. Rows of initial conditions
+        and model parameters are solved as one vectorized batch, so a grid
+        from parameter_grid maps the largest exponent over parameter space
+        in a single integration.
+
+        Parameters
+        ----------
+        initial_conditions
+            Initial conditions, shape [d] or [N, d], defaults to the model's.
+        model_parameters
+            Model parameters, shape [p] or [N, p], or a mapping of
+            parameter index to values, expanded with parameter_grid.
+        duration
+            Time over which the exponents are averaged, defaults to final_time.
+        interval
+            Time between re-orthonormalizations.
+        transient
+            Time integrated and discarded before averaging.
+        solver
+            NumPy integrator, 'dopri5', 'rosenbrock' or 'radau'.
+        options
+            Solver keyword arguments, e.g. rtol and atol.
+
+        Returns
+        -------
+        np.ndarray
+            Exponents, largest first, shape [d], or [N, d] for a batch.
+
+        """
+        started = time.perf_counter()
+        if isinstance(model_parameters, dict):
+            model_parameters = self.parameter_grid(model_parameters)
+        if initial_conditions is None:
+            initial_conditions = self.initial_conditions
+        if model_parameters is None:
+            model_parameters = self.model_parameters
+        single = np.ndim(initial_conditions) < 2 and np.ndim(model_parameters) < 2
+        init_states, parameters = self.batch_converter(initial_conditions, model_parameters)
+        duration = self.final_time if duration is None else duration
+        stats = self.new_stats('numpy', solver, len(init_states))
+        exponents = lyapunov.spectrum(self, init_states, parameters, duration, interval, transient, solver, stats,
+                                      **options)
+        stats.integrate_time = stats.session_time = time.perf_counter() - started
+        self.record_stats(stats, started)
+        return exponents[0] if single else exponents
+
+    def parameter_grid(self, arg1: dict) -> np.ndarray:
+        """Parameter grid.
+
+        Builds one row of model parameters per point of the cartesian
+        product of the given values, the other parameters keeping the
+        model's own values. The last index varies fastest.
+
+        Parameters
+        ----------
+        arg1
+            Mapping of parameter index to the values it takes.
+
+        Returns
+        -------
+        np.ndarray
+            Model parameters, shape [M, p].
+
+        """
+        indices = list(arg1)
+        points = list(itertools.product(*(arg1[index] for index in indices)))
+        grid = np.tile(self.init_converter(self.model_parameters), (len(points), 1))
+        grid[:, indices] = points
+        return grid
+
+    def sweep(self, param_grid, initial_conditions=None, workers=None, block_size=None, solver=None,
+              checkpoint=None, **options) -> np.ndarray:
+        """Sweep
+
+        Solves the model for every row of param_grid on a pool of worker
+        processes using the NumPy backend. Each worker solves contiguous
+        blocks of rows as vectorized batches and writes them into shared
+        memory, so results come back in row order without pickling arrays.
+        Profiling hooks get the stats of each block in this process as it
+        finishes, and self.stats their total.
+
+        Parameters
+        ----------
+        param_grid
+            Model parameters, shape [M, p], or a mapping of parameter index
+            to values, expanded with parameter_grid.
+        initial_conditions
+            Initial conditions, shape [d] or [M, d], defaults to the model's.
+        workers
+            Number of worker processes, defaults to os.cpu_count().
+        block_size
+            Rows per task, defaults to fizzpy.parallel.BLOCK_SIZE. Each
+            block shares its adaptive step size, so results depend on it
+            but not on workers.
+        solver
+            NumPy solver, see solve.
+        checkpoint
+            Optional fizzpy.checkpoint.Checkpoint, or its directory, to
+            write the solutions into and record finished blocks in, so an
+            interrupted sweep run again with the same arguments only solves
+            the blocks it had not finished, with any number of workers.
+        options
+            Solver keyword arguments, e.g. rtol and atol.
+
+        Returns
+        -------
+        np.ndarray
+            Solutions of shape [M, d, T].
+
+        """
+        if isinstance(param_grid, dict):
+            param_grid = self.parameter_grid(param_grid)
+        if initial_conditions is None:
+            initial_conditions = self.initial_conditions
+        started = time.perf_counter()
+        init_states, parameters = self.batch_converter(initial_conditions, param_grid)
+        stats = self.new_stats('numpy', solver, len(init_states))
+        output = parallel.sweep(self, init_states, parameters, workers, block_size, solver, checkpoint, stats,
+                                **options)
+        stats.integrate_time = stats.session_time = time.perf_counter() - started
+        stats.total_time = time.perf_counter() - started
+        self.stats = stats
+        return output
+
+    def frequency_response(self, currents, index=None, initial_conditions=None, workers=None, branches=None,
+                           window=None, max_time=None, rtol=1e-3, intervals=3, solver='dopri5',
+                           **options) -> np.ndarray:
+        """Frequency response
+
+        Firing frequency against input current, the f-I curve, with each
+        level warm started from the previous level's orbit, stopped once
+        its interspike intervals settle, and independent branches of
+        levels run on worker processes, see fizzpy.frequency.response.
+
+        Parameters
+        ----------
+        currents
+            Values of the input parameter, shape [M].
+        index
+            Index of the input parameter, defaults to the model's input_parameter.
+        initial_conditions
+            Initial conditions of the first level of each branch, shape [d],
+            defaults to the model's.
+        workers
+            Number of worker processes, defaults to os.cpu_count().
+        branches
+            Number of branches, defaults to one per worker.
+        window
+            Time without spikes after which to check for rest, defaults to
+            half of final_time.
+        max_time
+            Time after which a level stops waiting for its frequency to
+            settle, defaults to ten times final_time.
+        rtol
+            Relative spread allowed between the last interspike intervals.
+        intervals
+            Number of consecutive interspike intervals that must agree.
+        solver
+            NumPy integrator with dense output, 'dopri5', 'rosenbrock' or 'radau'.
+        options
+            Solver keyword arguments, e.g. rtol and atol of the integrator.
+
+        Returns
+        -------
+        np.ndarray
+            Frequencies, in spikes per unit of model time, shape [M].
+
+        """
+        index = self.input_parameter if index is None else index
+        if index is None:
+            raise ValueError('%s has no input_parameter, pass index explicitly.' % type(self).__name__)
+        started = time.perf_counter()
+        if initial_conditions is None:
+            initial_conditions = self.initial_conditions
+        stats = self.new_stats('numpy', solver, np.size(currents))
+        frequencies = frequency.response(self, self.init_converter(initial_conditions),
+                                         self.init_converter(self.model_parameters), index, currents, workers,
+                                         branches, window, max_time, rtol, intervals, solver, stats, **options)
+        stats.integrate_time = stats.session_time = time.perf_counter() - started
+        self.record_stats(stats, started)
+        return frequencies
+
+
+atexit.register(Model.close_sessions)
+
 
 class CoupledDampedSHM(Model):
 
@@ -126,6 +1553,8 @@ class CoupledDampedSHM(Model):
 
     """
 
+    state_names = ('x', 'y', 'x1', 'y1')
+
     def __init__(
             self,
             initial_conditions=[0.5, 0.1, 0.1, 0.1],
@@ -137,17 +1566,23 @@ class CoupledDampedSHM(Model):
         self.final_time = final_time
         self.time_steps = time_steps
 
-    def equations(self, state, t):
-        x, y, x1, y1 = tf.unstack(state)
+    def equations(self, state, t, p, ops):
+        x, y, x1, y1 = ops.unstack(state)
         dx = y
-        dy = -(self.model_parameters[1] / self.model_parameters[3]) * x \
-            + (self.model_parameters[2] / self.model_parameters[3]) * x1 \
-            - (self.model_parameters[0] / self.model_parameters[3]) * y
+        dy = -(p[1] / p[3]) * x \
+            + (p[2] / p[3]) * x1 \
+            - (p[0] / p[3]) * y
         dx1 = y1
-        dy1 = (self.model_parameters[2] / self.model_parameters[3]) * x \
-            - (self.model_parameters[1] / self.model_parameters[3]) * x1 \
-            - (self.model_parameters[0] / self.model_parameters[3]) * y1
-        return tf.stack([dx, dy, dx1, dy1])
+        dy1 = (p[2] / p[3]) * x \
+            - (p[1] / p[3]) * x1 \
+            - (p[0] / p[3]) * y1
+        return ops.stack([dx, dy, dx1, dy1])
+
+    def jacobian(self, state, t, p, ops):
+        return ops.matrix([[0, 1, 0, 0],
+                           [-p[1] / p[3], -p[0] / p[3], p[2] / p[3], 0],
+                           [0, 0, 0, 1],
+                           [p[2] / p[3], 0, -p[1] / p[3], -p[0] / p[3]]])
 
 
 class DampedSHM(Model):
@@ -158,6 +1593,8 @@ class DampedSHM(Model):
 
     """
 
+    state_names = ('x', 'y')
+
     def __init__(
             self,
             initial_conditions=[0.1, 0.1],
@@ -169,11 +1606,15 @@ class DampedSHM(Model):
         self.final_time = final_time
         self.time_steps = time_steps
 
-    def equations(self, state, t):
-        x, y = tf.unstack(state)
+    def equations(self, state, t, p, ops):
+        x, y = ops.unstack(state)
         dx = y
-        dy = (-self.model_parameters[0] * y - self.model_parameters[1] * x) / self.model_parameters[2]
-        return tf.stack([dx, dy])
+        dy = (-p[0] * y - p[1] * x) / p[2]
+        return ops.stack([dx, dy])
+
+    def jacobian(self, state, t, p, ops):
+        return ops.matrix([[0, 1],
+                           [-p[1] / p[2], -p[0] / p[2]]])
 
 
 class FitzhughNagumo(Model):
@@ -185,6 +1626,10 @@ class FitzhughNagumo(Model):
 
     """
 
+    state_names = ('v', 'w')
+    spike_threshold = 1.
+    input_parameter = 3
+
     def __init__(
             self,
             initial_conditions=[0.01, 0.01],
@@ -196,11 +1641,136 @@ class FitzhughNagumo(Model):
         self.final_time = final_time
         self.time_steps = time_steps
 
-    def equations(self, state, t):
-        v, w = tf.unstack(state)
-        dv = self.model_parameters[2] * (v + w - (v**3/3) + self.model_parameters[3])
-        dw = -1/self.model_parameters[2] * (v - self.model_parameters[0] + self.model_parameters[1]*w)
-        return tf.stack([dv, dw])
+    def equations(self, state, t, p, ops):
+        v, w = ops.unstack(state)
+        dv = p[2] * (v + w - (v**3/3) + p[3])
+        dw = -1/p[2] * (v - p[0] + p[1]*w)
+        return ops.stack([dv, dw])
+
+    def jacobian(self, state, t, p, ops):
+        v, w = ops.unstack(state)
+        return ops.matrix([[p[2] * (1 - v**2), p[2]],
+                           [-1/p[2], -p[1]/p[2]]])
+
+
+class FitzhughNagumoNetwork(Model):
+
+    """Fitzhugh-Nagumo network model
+
+    This system of ODEs is an implementation of a network of N
+    Fitzhugh-Nagumo units, diffusively coupled through the membrane
+    potential by a sparse weighted connectivity matrix W:
+
+        dv_i = c * (v_i + w_i - v_i**3/3 + I) + g * sum_j W_ij * (v_j - v_i)
+        dw_i = -1/c * (v_i - a + b*w_i)
+
+    The coupling is kept as the CSR graph Laplacian of W, so each
+    evaluation costs O(N + nnz) and networks of 100k+ units fit on one
+    machine. The state is [v_0 .. v_N-1, w_0 .. w_N-1] and the model
+    parameters are [a, b, c, I, g], as for FitzhughNagumo plus the
+    coupling strength g. The coupling is sparse, so only the NumPy
+    backend applies, and the explicit dopri5 integrator is used by
+    default since the implicit solvers would form dense [2N, 2N]
+    Jacobians. For large networks prefer reductions or output_path to
+    holding the whole [2N, T] solution in memory.
+
+    """
+
+    backend = 'numpy'
+    solver = 'dopri5'
+    spike_threshold = 1.
+
+    def __init__(
+            self,
+            coupling=None,
+            initial_conditions=None,
+            model_parameters=[0.75, 0.8, 3, -0.4, 0.1],
+            final_time=100,
+            time_steps=500):
+        from scipy import sparse
+
+        if coupling is None:
+            coupling = self.ring(100)
+        coupling = sparse.csr_matrix(coupling, dtype=np.float64)
+        size = coupling.shape[0]
+        degree = np.asarray(coupling.sum(axis=1)).ravel()
+        self.coupling = coupling
+        self.laplacian = (coupling - sparse.diags(degree)).tocsr()
+        self.size = size
+        if initial_conditions is None:
+            initial_conditions = np.full(2 * size, 0.01)
+        self.initial_conditions = np.array(initial_conditions)
+        self.model_parameters = model_parameters
+        self.final_time = final_time
+        self.time_steps = time_steps
+
+    @staticmethod
+    def ring(size: int, neighbours: int = 1, weight: float = 1.):
+        """Ring coupling.
+
+        Parameters
+        ----------
+        size
+            Number of units.
+        neighbours
+            Number of neighbours coupled on each side of every unit.
+        weight
+            Weight of each connection.
+
+        Returns
+        -------
+        scipy.sparse.csr_matrix
+            Symmetric [size, size] coupling matrix.
+
+        """
+        from scipy import sparse
+
+        rows = np.repeat(np.arange(size), 2 * neighbours)
+        offsets = np.tile(np.r_[np.arange(1, neighbours + 1), -np.arange(1, neighbours + 1)], size)
+        columns = (rows + offsets) % size
+        return sparse.csr_matrix((np.full(len(rows), weight), (rows, columns)), shape=(size, size))
+
+    @staticmethod
+    def random(size: int, degree: int = 10, weight: float = 1., seed=None):
+        """Random coupling.
+
+        Parameters
+        ----------
+        size
+            Number of units.
+        degree
+            Number of inputs of every unit, drawn uniformly without self
+            connections. Repeated draws add up.
+        weight
+            Weight of each connection.
+        seed
+            Seed for np.random.default_rng.
+
+        Returns
+        -------
+        scipy.sparse.csr_matrix
+            [size, size] coupling matrix, row i holding the inputs of unit i.
+
+        """
+        from scipy import sparse
+
+        rng = np.random.default_rng(seed)
+        rows = np.repeat(np.arange(size), degree)
+        columns = (rows + rng.integers(1, size, len(rows))) % size
+        return sparse.csr_matrix((np.full(len(rows), weight), (rows, columns)), shape=(size, size))
+
+    def components(self) -> dict:
+        return {'v': slice(0, self.size), 'w': slice(self.size, 2 * self.size)}
+
+    def cache_key(self, backend=None, solver=None, options=None) -> tuple:
+        laplacian = self.laplacian
+        return super().cache_key(backend, solver, options) + (laplacian.indptr, laplacian.indices, laplacian.data)
+
+    def equations(self, state, t, p, ops):
+        v, w = state[:self.size], state[self.size:]
+        dv = p[2] * (v + w - (v**3/3) + p[3]) + p[4] * (self.laplacian @ v)
+        dw = -1/p[2] * (v - p[0] + p[1]*w)
+        return ops.concat([dv, dw])
 
 
 class HindmarshRose(Model):
@@ -212,6 +1782,10 @@ class HindmarshRose(Model):
 
     """
 
+    state_names = ('x', 'y', 'z')
+    spike_threshold = 1.
+    input_parameter = 6
+
     def __init__(
             self,
             initial_conditions=[0.1, 0.1, 0.1],
@@ -223,13 +1797,19 @@ class HindmarshRose(Model):
         self.final_time = final_time
         self.time_steps = time_steps
 
-    def equations(self, state, t):
-        x, y, z = tf.unstack(state)
-        dx = y - self.model_parameters[0] * (x ** 3) \
-            + (self.model_parameters[1] * (x ** 2)) - z + self.model_parameters[6]
-        dy = self.model_parameters[2] - self.model_parameters[3] * (x ** 2) - y
-        dz = self.model_parameters[4] * (self.model_parameters[5] * (x - self.model_parameters[7]) - z)
-        return tf.stack([dx, dy, dz])
+    def equations(self, state, t, p, ops):
+        x, y, z = ops.unstack(state)
+        dx = y - p[0] * (x ** 3) \
+            + (p[1] * (x ** 2)) - z + p[6]
+        dy = p[2] - p[3] * (x ** 2) - y
+        dz = p[4] * (p[5] * (x - p[7]) - z)
+        return ops.stack([dx, dy, dz])
+
+    def jacobian(self, state, t, p, ops):
+        x, y, z = ops.unstack(state)
+        return ops.matrix([[-3 * p[0] * (x ** 2) + 2 * p[1] * x, 1, -1],
+                           [-2 * p[3] * x, -1, 0],
+                           [p[4] * p[5], 0, -p[4]]])
 
 
 class HodgkinHuxley(Model):
@@ -241,6 +1821,10 @@ class HodgkinHuxley(Model):
 
     """
 
+    state_names = ('v', 'n', 'm', 'h')
+    spike_threshold = 50.
+    input_parameter = 7
+
     def __init__(
             self,
             initial_conditions=[0.1, 0.1, 0.1, 0.1],
@@ -252,29 +1836,51 @@ class HodgkinHuxley(Model):
         self.final_time = final_time
         self.time_steps = time_steps
 
-    def equations(self, state, t):
-        i, n, m, h = tf.unstack(state)
+    def equations(self, state, t, p, ops):
+        i, n, m, h = ops.unstack(state)
         # Alpha and beta functions for channel activation functions
-        alpha_n = (0.01 * (i + 10)) / (tf.exp((i + 10) / 10) - 1)
-        beta_n = 0.125 * tf.exp(i / 80)
-        alpha_m = (0.1 * (i + 25)) / (tf.exp((i + 25) / 10) - 1)
-        beta_m = 4 * tf.exp(i / 18)
-        alpha_h = (0.07 * tf.exp(i / 20))
-        beta_h = 1 / (tf.exp((i + 30) / 10) + 1)
+        alpha_n = (0.01 * (i + 10)) / (ops.exp((i + 10) / 10) - 1)
+        beta_n = 0.125 * ops.exp(i / 80)
+        alpha_m = (0.1 * (i + 25)) / (ops.exp((i + 25) / 10) - 1)
+        beta_m = 4 * ops.exp(i / 18)
+        alpha_h = (0.07 * ops.exp(i / 20))
+        beta_h = 1 / (ops.exp((i + 30) / 10) + 1)
         # Differential Equations
-        di = (self.model_parameters[0] * (n ** 4) * (i - self.model_parameters[3])
-              + self.model_parameters[1] * (m ** 3) * h * (i - self.model_parameters[4])
-              + self.model_parameters[2] * (i - self.model_parameters[5])
-              - self.model_parameters[7]) * (-1 / self.model_parameters[6])
+        di = (p[0] * (n ** 4) * (i - p[3])
+              + p[1] * (m ** 3) * h * (i - p[4])
+              + p[2] * (i - p[5])
+              - p[7]) * (-1 / p[6])
         dn = alpha_n * (1 - n) - beta_n * n
         dm = alpha_m * (1 - m) - beta_m * m
         dh = alpha_h * (1 - h) - beta_h * h
-        return tf.stack([di, dn, dm, dh])
-
-    def solve(self):
-        i, n, m, h = self.tf_session(self.equations, self.initial_conditions)
-        self.solution = -1*i, n, m, h
-        return self.solution
+        return ops.stack([di, dn, dm, dh])
+
+    def jacobian(self, state, t, p, ops):
+        i, n, m, h = ops.unstack(state)
+        # Alpha and beta functions and their derivatives with respect to i
+        u_n = ops.exp((i + 10) / 10)
+        u_m = ops.exp((i + 25) / 10)
+        alpha_n = (0.01 * (i + 10)) / (u_n - 1)
+        dalpha_n = 0.01 * ((u_n - 1) - (i + 10) / 10 * u_n) / (u_n - 1) ** 2
+        beta_n = 0.125 * ops.exp(i / 80)
+        alpha_m = (0.1 * (i + 25)) / (u_m - 1)
+        dalpha_m = 0.1 * ((u_m - 1) - (i + 25) / 10 * u_m) / (u_m - 1) ** 2
+        beta_m = 4 * ops.exp(i / 18)
+        alpha_h = (0.07 * ops.exp(i / 20))
+        u_h = ops.exp((i + 30) / 10)
+        beta_h = 1 / (u_h + 1)
+        dbeta_h = -0.1 * u_h / (u_h + 1) ** 2
+        return ops.matrix([[-(p[0] * (n ** 4) + p[1] * (m ** 3) * h + p[2]) / p[6],
+                            -4 * p[0] * (n ** 3) * (i - p[3]) / p[6],
+                            -3 * p[1] * (m ** 2) * h * (i - p[4]) / p[6],
+                            -p[1] * (m ** 3) * (i - p[4]) / p[6]],
+                           [dalpha_n * (1 - n) - beta_n / 80 * n, -(alpha_n + beta_n), 0, 0],
+                           [dalpha_m * (1 - m) - beta_m / 18 * m, 0, -(alpha_m + beta_m), 0],
+                           [alpha_h / 20 * (1 - h) - dbeta_h * h, 0, 0, -(alpha_h + beta_h)]])
+
+    def output_converter(self, arg1):
+        arg1[0] *= -1
+        return arg1
 
 
 class HIV(Model):
@@ -286,6 +1892,8 @@ class HIV(Model):
 
     """
 
+    state_names = ('x1', 'x2', 'x3')
+
     def __init__(
             self,
             initial_conditions=[1000, 0, 1],
@@ -297,12 +1905,18 @@ class HIV(Model):
         self.final_time = final_time
         self.time_steps = time_steps
 
-    def equations(self, state, t):
-        x1, x2, x3 = tf.unstack(state)
-        dx1 = -self.model_parameters[1] * x1 - self.model_parameters[4] * x1 * x3 + self.model_parameters[0]
-        dx2 = -self.model_parameters[3] * x2 + self.model_parameters[4] * x1 * x3
-        dx3 = self.model_parameters[5] * x2 - self.model_parameters[2] * x3
-        return tf.stack([dx1, dx2, dx3])
+    def equations(self, state, t, p, ops):
+        x1, x2, x3 = ops.unstack(state)
+        dx1 = -p[1] * x1 - p[4] * x1 * x3 + p[0]
+        dx2 = -p[3] * x2 + p[4] * x1 * x3
+        dx3 = p[5] * x2 - p[2] * x3
+        return ops.stack([dx1, dx2, dx3])
+
+    def jacobian(self, state, t, p, ops):
+        x1, x2, x3 = ops.unstack(state)
+        return ops.matrix([[-p[1] - p[4] * x3, 0, -p[4] * x1],
+                           [p[4] * x3, -p[3], p[4] * x1],
+                           [0, p[5], -p[2]]])
 
 
 class Lorenz(Model):
@@ -314,6 +1928,8 @@ class Lorenz(Model):
 
     """
 
+    state_names = ('x', 'y', 'z')
+
     def __init__(
             self,
             initial_conditions=[0, 2, 20],
@@ -324,14 +1940,19 @@ class Lorenz(Model):
         self.model_parameters = model_parameters
         self.final_time = final_time
         self.time_steps = time_steps
-        self.state = tf.tensor()
 
-    def equations(self, state, t):
-        x, y, z = tf.unstack(state)
-        dx = self.model_parameters[1] * (y - x)
-        dy = x * (self.model_parameters[0] - z) - y
-        dz = x * y - self.model_parameters[2] * z
-        return tf.stack([dx, dy, dz])
+    def equations(self, state, t, p, ops):
+        x, y, z = ops.unstack(state)
+        dx = p[1] * (y - x)
+        dy = x * (p[0] - z) - y
+        dz = x * y - p[2] * z
+        return ops.stack([dx, dy, dz])
+
+    def jacobian(self, state, t, p, ops):
+        x, y, z = ops.unstack(state)
+        return ops.matrix([[-p[1], p[1], 0],
+                           [p[0] - z, -1, -x],
+                           [y, x, -p[2]]])
 
 
 class MorrisLecar(Model):
@@ -343,6 +1964,10 @@ class MorrisLecar(Model):
 
     """
 
+    state_names = ('v', 'n')
+    spike_threshold = 0.
+    input_parameter = 11
+
     def __init__(
             self,
             initial_conditions=[0.01, 0.01],
@@ -354,17 +1979,61 @@ class MorrisLecar(Model):
         self.final_time = final_time
         self.time_steps = time_steps
 
-    def equations(self, state, t):
-        v, n = tf.unstack(state)
-        dv = (-self.model_parameters[3]
-              * (0.5 * (1 + tf.tanh((v - self.model_parameters[7]) / self.model_parameters[8])))
-              * (v - self.model_parameters[2]) - self.model_parameters[1] * n
-              * (v - self.model_parameters[0]) - self.model_parameters[5]
-              * (v - self.model_parameters[4]) + self.model_parameters[11])
-        dn = (self.model_parameters[6]
-              * ((0.5 * (1 + tf.tanh((v - self.model_parameters[9]) / self.model_parameters[10]))) - n)) \
-            / (1 / tf.cosh((v - self.model_parameters[9]) / (2 * self.model_parameters[10])))
-        return tf.stack([dv, dn])
+    def equations(self, state, t, p, ops):
+        v, n = ops.unstack(state)
+        dv = (-p[3]
+              * (0.5 * (1 + ops.tanh((v - p[7]) / p[8])))
+              * (v - p[2]) - p[1] * n
+              * (v - p[0]) - p[5]
+              * (v - p[4]) + p[11])
+        dn = (p[6]
+              * ((0.5 * (1 + ops.tanh((v - p[9]) / p[10]))) - n)) \
+            / (1 / ops.cosh((v - p[9]) / (2 * p[10])))
+        return ops.stack([dv, dn])
+
+
+class Rikitake(Model):
+
+    """Rikitake dynamo
+
+    This system of ODEs is an implementation of the two-disk Rikitake
+    dynamo, a model of chaotic reversals of the geomagnetic field.
+
+    """
+
+    state_names = ('x1', 'x2', 'x3', 'x4', 'x5', 'x6')
+
+    def __init__(
+            self,
+            initial_conditions=[-1.4, -1, -1, -1.4, 2.2, -1.5],
+            model_parameters=[0.5, 50., 8., 0.5],
+            final_time=100,
+            time_steps=10000):
+        self.initial_conditions = np.array(initial_conditions)
+        self.model_parameters = model_parameters
+        self.final_time = final_time
+        self.time_steps = time_steps
+
+    def equations(self, state, t, p, ops):
+        x1, x2, x3, x4, x5, x6 = ops.unstack(state)
+        dx1 = p[2] * (x4 - x1)
+        dx2 = p[2] * (x3 - x2)
+        dx3 = x1 * x5 + p[0] * x2 - (1 + p[0]) * x3
+        dx4 = x2 * x6 + p[0] * x1 - (1 + p[0]) * x4
+        dx5 = p[1] * (1 - (1 + p[0]) * x1 * x3 + p[0] * x1 * x2) - p[3] * x5
+        dx6 = p[1] * (1 - (1 + p[0]) * x2 * x4 + p[0] * x2 * x1) - p[3] * x6
+        return ops.stack([dx1, dx2, dx3, dx4, dx5, dx6])
+
+    def jacobian(self, state, t, p, ops):
+        x1, x2, x3, x4, x5, x6 = ops.unstack(state)
+        return ops.matrix([[-p[2], 0, 0, p[2], 0, 0],
+                           [0, -p[2], p[2], 0, 0, 0],
+                           [x5, p[0], -(1 + p[0]), 0, x1, 0],
+                           [p[0], x6, 0, -(1 + p[0]), 0, x2],
+                           [p[1] * (p[0] * x2 - (1 + p[0]) * x3), p[1] * p[0] * x1, -p[1] * (1 + p[0]) * x1, 0,
+                            -p[3], 0],
+                           [p[1] * p[0] * x2, p[1] * (p[0] * x1 - (1 + p[0]) * x4), 0, -p[1] * (1 + p[0]) * x2, 0,
+                            -p[3]]])
 
 
 class Vanderpol(Model):
@@ -377,6 +2046,8 @@ class Vanderpol(Model):
 
     """
 
+    state_names = ('x', 'y')
+
     def __init__(
             self,
             initial_conditions=[0.01, 0.01],
@@ -388,8 +2059,13 @@ class Vanderpol(Model):
         self.final_time = final_time
         self.time_steps = time_steps
 
-    def equations(self, state, t):
-        x, y = tf.unstack(state)
+    def equations(self, state, t, p, ops):
+        x, y = ops.unstack(state)
         dx = y
-        dy = self.model_parameters[0]*y*(1 - x**2) - x
-        return tf.stack([dx, dy])
+        dy = p[0]*y*(1 - x**2) - x
+        return ops.stack([dx, dy])
+
+    def jacobian(self, state, t, p, ops):
+        x, y = ops.unstack(state)
+        return ops.matrix([[0, 1],
+                           [-2*p[0]*x*y - 1, p[0]*(1 - x**2)]])
@@ -0,0 +1,314 @@
+#!/usr/bin/env python
+"""Solver daemon
+
+Long-lived worker process that keeps Tensorflow, its compiled graphs and
+sessions, and the numba kernels warm, and serves solve, batch and sweep
+requests over a Unix domain socket, so short jobs skip the start-up cost:
+
+    python -m fizzpy.daemon /tmp/fizzpy.sock --warm Vanderpol DampedSHM
+
+    with Client('/tmp/fizzpy.sock') as client:
+        solution = client.solve('Vanderpol', final_time=20, time_steps=200)
+
+Messages, both ways, are a JSON header followed by raw arrays:
+
+    uint32 header length, big endian
+    header: UTF-8 JSON, its 'arrays' entry lists [name, dtype, shape] of
+    the arrays that follow, in order
+    array bytes, C order, no padding
+
+so arrays cross the socket as their bytes, never as JSON or pickles, and
+are read straight into a buffer the result array is a view of.
+"""
+import argparse
+import json
+import os
+import socket
+import socketserver
+import struct
+import sys
+
+import numpy as np
+
+
+HEADER = struct.Struct('!I')
+
+
+def models() -> dict:
+    """Every Model subclass in fizzpy.core, by class name, the models the daemon serves."""
+    # Imported here so clients, which only need the protocol, never load the models
+    from fizzpy import core
+
+    return {model.__name__: model for model in core.Model.__subclasses__() if model.__module__ == core.__name__}
+
+
+def receive(stream, size: int) -> bytearray:
+    """Read exactly size bytes, None at end of stream before the first."""
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = stream.recv_into(view[received:])
+        if not count:
+            if received == 0:
+                return None
+            raise ConnectionError('Connection closed mid-message.')
+        received += count
+    return buffer
+
+
+def send_message(stream, header: dict, arrays: dict = None):
+    """Send a header and arrays, see the module docstring for the layout."""
+    arrays = {name: np.ascontiguousarray(array) for name, array in (arrays or {}).items()}
+    header = dict(header, arrays=[[name, array.dtype.str, array.shape] for name, array in arrays.items()])
+    encoded = json.dumps(header).encode()
+    stream.sendall(HEADER.pack(len(encoded)) + encoded)
+    for array in arrays.values():
+        stream.sendall(memoryview(array).cast('B'))
+
+
+def receive_message(stream) -> list:
+    """Receive a header and its arrays, None at end of stream.
+
+    Returns
+    -------
+    list
+        header: the decoded JSON header.
+        arrays: dict of name to array, each a view of its own receive buffer.
+
+    """
+    prefix = receive(stream, HEADER.size)
+    if prefix is None:
+        return None
+    header = json.loads(receive(stream, HEADER.unpack(prefix)[0]).decode())
+    arrays = {}
+    for name, dtype, shape in header.pop('arrays'):
+        dtype = np.dtype(dtype)
+        size = int(np.prod(shape)) * dtype.itemsize
+        buffer = receive(stream, size) if size else bytearray()
+        arrays[name] = np.frombuffer(buffer, dtype=dtype).reshape(shape)
+    return [header, arrays]
+
+
+def instance(header: dict, arrays: dict):
+    """Model for a request, with its initial conditions, parameters and time grid."""
+    model = models().get(header.get('model'))
+    if model is None:
+        raise ValueError('Unknown model %r, expected one of %s.' % (header.get('model'), sorted(models())))
+    model = model()
+    for name in ('initial_conditions', 'model_parameters'):
+        if name in arrays and arrays[name].ndim == 1:
+            setattr(model, name, arrays[name])
+    for name in ('final_time', 'time_steps'):
+        if header.get(name) is not None:
+            setattr(model, name, header[name])
+    return model
+
+
+def respond(header: dict, arrays: dict) -> list:
+    """Run one request, returns the response header and arrays."""
+    op = header.get('op')
+    if op == 'ping':
+        return [{'pid': os.getpid()}, {}]
+    model = instance(header, arrays)
+    options = header.get('options', {})
+    if op == 'solve':
+        solution = np.asarray(model.solve(header.get('backend'), header.get('solver'), **options))
+    elif op == 'solve_batch':
+        solution = model.solve_batch(arrays.get('initial_conditions'), arrays.get('model_parameters'),
+                                     header.get('backend'), header.get('solver'), **options)
+    elif op == 'sweep':
+        solution = model.sweep(arrays['param_grid'], arrays.get('initial_conditions'), header.get('workers'),
+                               header.get('block_size'), header.get('solver'), **options)
+    else:
+        raise ValueError('Unknown op %r.' % op)
+    stats = model.stats.as_dict() if getattr(model, 'stats', None) is not None else None
+    return [{'stats': stats}, {'solution': solution}]
+
+
+class Handler(socketserver.BaseRequestHandler):
+
+    """Serves the requests of one connection in turn until the client closes it."""
+
+    def handle(self):
+        while True:
+            message = receive_message(self.request)
+            if message is None:
+                return
+            header, arrays = message
+            if header.get('op') == 'shutdown':
+                send_message(self.request, {})
+                self.server.shutdown()
+                return
+            try:
+                response, results = respond(header, arrays)
+            except Exception as error:
+                response, results = {'error': type(error).__name__, 'message': str(error)}, {}
+            send_message(self.request, response, results)
+
+
+class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+
+    """Solver daemon
+
+    Threaded Unix domain socket server, one thread per connection. The
+    socket is created readable and writable by its owner only.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path: str, warm=()):
+        if os.path.exists(path):
+            os.unlink(path)
+        umask = os.umask(0o177)
+        try:
+            super().__init__(path, Handler)
+        finally:
+            os.umask(umask)
+        self.path = path
+        for name in warm:
+            models()[name]().solve()
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class Client:
+
+    """Client
+
+    Connection to a solver daemon. Requests on one client are sent one at
+    a time; use a client per thread for concurrent requests. Errors raised
+    by the daemon are raised again here, as ValueError for invalid requests
+    and RuntimeError otherwise.
+    """
+
+    def __init__(self, path: str, timeout: float = None):
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.settimeout(timeout)
+        self.socket.connect(path)
+        self.stats = None
+
+    def request(self, header: dict, arrays: dict = None) -> dict:
+        send_message(self.socket, header, arrays)
+        message = receive_message(self.socket)
+        if message is None:
+            raise ConnectionError('The daemon closed the connection.')
+        response, results = message
+        if 'error' in response:
+            raise (ValueError if response['error'] == 'ValueError' else RuntimeError)(
+                '%s: %s' % (response['error'], response['message']))
+        self.stats = response.get('stats')
+        return results
+
+    def call(self, op: str, model: str, initial_conditions, model_parameters, final_time, time_steps, backend,
+             solver, options: dict, **fields) -> np.ndarray:
+        arrays = {name: np.asarray(value, dtype=np.float64) for name, value in
+                  [('initial_conditions', initial_conditions), ('model_parameters', model_parameters)]
+                  if value is not None}
+        arrays.update(fields.pop('arrays', {}))
+        header = dict(op=op, model=model, final_time=final_time, time_steps=time_steps, backend=backend,
+                      solver=solver, options=options, **fields)
+        return self.request(header, arrays)['solution']
+
+    def solve(self, model: str, initial_conditions=None, model_parameters=None, final_time=None, time_steps=None,
+              backend=None, solver=None, **options) -> np.ndarray:
+        """Solve.
+
+        Parameters
+        ----------
+        model
+            Name of the fizzpy.core model.
+        initial_conditions
+            Initial conditions, shape [d], defaults to the model's.
+        model_parameters
+            Model parameters, shape [p], defaults to the model's.
+        final_time
+            Final time, defaults to the model's.
+        time_steps
+            Number of time points, defaults to the model's.
+        backend
+            'tensorflow', 'numpy' or 'numba', see Model.solve.
+        solver
+            Solver, see Model.solve.
+        options
+            Solver keyword arguments, e.g. rtol and atol.
+
+        Returns
+        -------
+        np.ndarray
+            The solution, shape [d, T]. The solve's stats, as a dict, are
+            kept as self.stats.
+
+        """
+        return self.call('solve', model, initial_conditions, model_parameters, final_time, time_steps, backend,
+                         solver, options)
+
+    def solve_batch(self, model: str, initial_conditions=None, model_parameters=None, final_time=None,
+                    time_steps=None, backend=None, solver=None, **options) -> np.ndarray:
+        """Solve batch, see Model.solve_batch and solve.
+
+        Returns
+        -------
+        np.ndarray
+            Solutions of shape [N, d, T].
+
+        """
+        return self.call('solve_batch', model, initial_conditions, model_parameters, final_time, time_steps,
+                         backend, solver, options)
+
+    def sweep(self, model: str, param_grid, initial_conditions=None, final_time=None, time_steps=None,
+              workers=None, block_size=None, solver=None, **options) -> np.ndarray:
+        """Sweep, see Model.sweep and solve.
+
+        Parameters
+        ----------
+        param_grid
+            Model parameters, shape [M, p].
+
+        Returns
+        -------
+        np.ndarray
+            Solutions of shape [M, d, T].
+
+        """
+        return self.call('sweep', model, initial_conditions, None, final_time, time_steps, None, solver, options,
+                         workers=workers, block_size=block_size,
+                         arrays={'param_grid': np.asarray(param_grid, dtype=np.float64)})
+
+    def ping(self) -> bool:
+        self.request({'op': 'ping'})
+        return True
+
+    def shutdown(self):
+        """Stop the daemon once its open connections are served."""
+        self.request({'op': 'shutdown'})
+
+    def close(self):
+        self.socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', help='path of the Unix domain socket to listen on')
+    parser.add_argument('--warm', nargs='+', default=[], choices=sorted(models()),
+                        help='models to solve once at start-up, building their graphs and sessions')
+    args = parser.parse_args(argv)
+    with Server(args.path, args.warm) as server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
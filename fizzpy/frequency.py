@@ -0,0 +1,203 @@
+import multiprocessing
+import os
+
+import numpy as np
+
+from fizzpy import parallel
+from fizzpy.backends import numpy_integrator
+from fizzpy.integrators import Event, EventLocator, advance
+
+
+def firing_rate(model, arg1: np.ndarray, arg2: np.ndarray, window: float, max_time: float, rtol: float,
+                intervals: int, solver, **options) -> list:
+    """Firing rate.
+
+    Integrates one input level until its frequency settles: as soon as the
+    last intervals interspike intervals agree to rtol, the level is on its
+    limit cycle and the frequency is one over their mean. A window without
+    spikes, over which the state has also settled to rtol, stops at zero,
+    so a slowly growing oscillation near onset is not mistaken for rest.
+    Levels that never settle, e.g. bursting or chaotic firing, run to
+    max_time and report the mean rate over the last window.
+
+    Parameters
+    ----------
+    model
+        Neuron model with a spike_threshold.
+    arg1
+        Initial conditions, shape [d].
+    arg2
+        Model parameters, shape [p].
+    window
+        Time without spikes after which to check for rest, and over which
+        the rate of a level that never settles is averaged.
+    max_time
+        Time after which to stop waiting for the frequency to settle.
+    rtol
+        Relative spread allowed between the last interspike intervals.
+    intervals
+        Number of consecutive interspike intervals that must agree.
+    solver
+        NumPy integrator with dense output, 'dopri5', 'rosenbrock' or 'radau'.
+    options
+        Solver keyword arguments, e.g. rtol and atol of the integrator.
+
+    Returns
+    -------
+    list
+        frequency: spikes per unit of model time.
+        y: state at the end, shape [d], to warm start the next level from.
+        h: step size at the end.
+        info_dict: the integrator's counters.
+
+    """
+    integrator = numpy_integrator(model.equations, arg1, arg2, 0., max_time, solver, model.jacobian, **options)
+    locator = EventLocator(integrator, [Event(0, model.spike_threshold, 1)], model.output_converter)
+    spikes = locator.times[0]
+    settled = []
+
+    def on_step(integrator) -> bool:
+        found = len(spikes)
+        locator(integrator)
+        if len(spikes) == found or len(spikes) <= intervals:
+            return False
+        last = np.diff(spikes[-intervals - 1:])
+        if np.ptp(last) <= rtol * last.mean():
+            settled.append(1 / last.mean())
+        return bool(settled)
+
+    frequency, rest = None, None
+    while frequency is None and integrator.t < max_time:
+        start = len(spikes)
+        advance(integrator, min(integrator.t + window, max_time), on_step)
+        y = integrator.y.copy()
+        if settled:
+            frequency = settled[0]
+        elif len(spikes) == start and rest is not None and np.allclose(y, rest, rtol=rtol, atol=rtol):
+            frequency = 0.
+        rest = y
+    if frequency is None:
+        times = [t for t in spikes if t >= max_time - window]
+        frequency = (len(times) - 1) / (times[-1] - times[0]) if len(times) > 1 else 0.
+    return [frequency, integrator.y.copy(), integrator.h, integrator.info()]
+
+
+def branch(model, arg1: np.ndarray, arg2: np.ndarray, window: float, max_time: float, rtol: float,
+           intervals: int, solver, options: dict) -> list:
+    """Firing rates along one branch of input levels, in order.
+
+    The first level starts from arg1, every later one from the state and
+    step size the previous level ended with, which is already on or near
+    its limit cycle, so the transient left to integrate is short.
+
+    Parameters
+    ----------
+    model
+        Neuron model with a spike_threshold.
+    arg1
+        Initial conditions, shape [d].
+    arg2
+        Model parameters of each level, shape [M, p].
+    window, max_time, rtol, intervals, solver, options
+        See firing_rate.
+
+    Returns
+    -------
+    list
+        frequencies: shape [M].
+        info_dict: the integrators' counters, summed over the levels.
+
+    """
+    frequencies = np.empty(len(arg2))
+    totals = {}
+    y, options = np.array(arg1, dtype=np.float64), dict(options)
+    for k, parameters in enumerate(arg2):
+        frequencies[k], y, options['first_step'], info = firing_rate(model, y, parameters, window, max_time, rtol,
+                                                                     intervals, solver, **options)
+        for name, value in info.items():
+            totals[name] = totals.get(name, 0) + value
+    return [frequencies, totals]
+
+
+def response(model, arg1: np.ndarray, arg2: np.ndarray, index: int, currents, workers: int = None,
+             branches: int = None, window: float = None, max_time: float = None, rtol: float = 1e-3,
+             intervals: int = 3, solver='dopri5', stats=None, **options) -> np.ndarray:
+    """Frequency response.
+
+    Firing frequency at each input level, an f-I curve. The levels are
+    split, in the order given, into contiguous branches. Each branch warm
+    starts every level from the orbit the previous one converged to and
+    stops integrating a level once its interspike intervals settle, see
+    firing_rate. Branches are independent and run on a pool of worker
+    processes.
+
+    Near a bistable region the curve depends on the direction the levels
+    are traced in, so pass them in descending order to follow the branch
+    coming down from repetitive firing. Results depend on the branch
+    split, pass branches to make them independent of the number of
+    workers.
+
+    Parameters
+    ----------
+    model
+        Neuron model with a spike_threshold.
+    arg1
+        Initial conditions, shape [d].
+    arg2
+        Model parameters, shape [p].
+    index
+        Index of the input parameter in arg2.
+    currents
+        Values of the input parameter, shape [M].
+    workers
+        Number of worker processes, defaults to os.cpu_count(). With one
+        worker the branches run in this process.
+    branches
+        Number of branches, defaults to one per worker.
+    window
+        Time without spikes after which to check for rest, defaults to
+        half the model's final_time.
+    max_time
+        Time after which a level stops waiting for its frequency to
+        settle, defaults to ten times the model's final_time.
+    rtol
+        Relative spread allowed between the last interspike intervals.
+    intervals
+        Number of consecutive interspike intervals that must agree.
+    solver
+        NumPy integrator with dense output, 'dopri5', 'rosenbrock' or 'radau'.
+    stats
+        Optional fizzpy.profiling.SolveStats to add the solver's counters to.
+    options
+        Solver keyword arguments, e.g. rtol and atol of the integrator.
+
+    Returns
+    -------
+    np.ndarray
+        Frequencies, in spikes per unit of model time, shape [M].
+
+    """
+    if model.spike_threshold is None:
+        raise ValueError('%s has no spike_threshold to count spikes with.' % type(model).__name__)
+    if solver is None or solver == 'odeint':
+        raise ValueError('Counting spikes needs an integrator with dense output, e.g. dopri5 or rosenbrock.')
+    currents = np.atleast_1d(np.asarray(currents, dtype=np.float64))
+    workers = os.cpu_count() if workers is None else workers
+    window = model.final_time / 2 if window is None else window
+    max_time = 10 * model.final_time if max_time is None else max_time
+    parameters = np.tile(arg2, (len(currents), 1))
+    parameters[:, index] = currents
+
+    spans = parallel.blocks(len(currents), branches or workers)
+    local = workers <= 1 or len(spans) <= 1
+    tasks = [(model if local else parallel.worker_model(model), arg1, parameters[start:stop], window, max_time, rtol,
+              intervals, solver, options) for start, stop in spans]
+    if local:
+        results = [branch(*task) for task in tasks]
+    else:
+        with multiprocessing.Pool(min(workers, len(tasks))) as pool:
+            results = pool.starmap(branch, tasks)
+    if stats is not None:
+        for _, info in results:
+            stats.add(info)
+    return np.concatenate([np.empty(0)] + [frequencies for frequencies, _ in results])
@@ -1,6 +1,3 @@
-import matplotlib.pyplot as plt
-
-
 def plotface(arg1, arg2=None, xlim=None, ylim=None, xlabel=None, ylabel=None, grid=None):
     """Plot face.
 
@@ -34,6 +31,8 @@ def plotface(arg1, arg2=None, xlim=None, ylim=None, xlabel=None, ylabel=None, gr
         provided.
 
     """
+    import matplotlib.pyplot as plt
+
     plt.figure()
     if arg2 is not None:
         plt.plot(arg1, arg2)
@@ -0,0 +1,621 @@
+import numpy as np
+
+
+class Integrator:
+
+    """Integrator base class
+
+    Adaptive one-step integrator driven by integrate(). Subclasses provide
+    attempt(h), which takes one trial step and returns the new state, its
+    derivative and the scaled error estimate, and dense_output(t).
+
+    States may be a single [d] vector or a [d, N] batch, in which case the
+    whole batch shares one step size.
+
+    States, stages and dense output are kept in dtype, float64 or float32.
+    float32 halves memory and bandwidth and doubles the SIMD width of large
+    batches, but its rounding, about 1e-7 relative, limits rtol to around
+    1e-5 and above. error_dtype float64 accumulates the error estimate and
+    its norm in float64, so step size control is not misled by that
+    rounding; time is always kept in float64.
+    """
+
+    order = None
+    safety = 0.9
+    min_factor = 0.2
+    max_factor = 10.
+    # Default tolerances, suited to the order of the method
+    rtol = 1e-6
+    atol = 1e-9
+    # Set from the constructor's arguments rather than by stepping, left out of state()
+    fixed = ('func', 'args', 'jac', 'dtype', 'error_dtype', 'A', 'B', 'E', 'P', 'V', 'V_real', 'V_complex')
+
+    def __init__(self, func, y0, t0=0., args=(), rtol=None, atol=None, first_step=None, max_step=np.inf,
+                 t_bound=np.inf, dtype=np.float64, error_dtype=None):
+        self.dtype = np.dtype(dtype)
+        self.error_dtype = self.dtype if error_dtype is None else np.dtype(error_dtype)
+        for name in ('dtype', 'error_dtype'):
+            if getattr(self, name) not in (np.float32, np.float64):
+                raise ValueError('Unsupported %s %s, expected float32 or float64.' % (name, getattr(self, name)))
+        self.func = func
+        self.args = args
+        self.rtol = self.rtol if rtol is None else rtol
+        self.atol = self.atol if atol is None else atol
+        self.max_step = max_step
+        self.t_bound = t_bound
+        self.nfev = 0
+        self.naccepted = 0
+        self.nrejected = 0
+        self.t = self.t_old = float(t0)
+        self.y = self.y_old = np.array(y0, dtype=self.dtype)
+        self.f = self.rhs(self.y, self.t)
+        self.h = self.initial_step() if first_step is None else first_step
+
+    def rhs(self, y, t):
+        self.nfev += 1
+        return np.asarray(self.func(y, t, *self.args), dtype=self.dtype)
+
+    def norm(self, arg1):
+        # RMS over the state, worst trajectory of a batch
+        return np.sqrt(np.mean(arg1 ** 2, axis=0)).max()
+
+    def error_norm(self, arg1, y_new):
+        y, y_new = self.y.astype(self.error_dtype, copy=False), y_new.astype(self.error_dtype, copy=False)
+        scale = self.atol + np.maximum(np.abs(y), np.abs(y_new)) * self.rtol
+        return float(self.norm(arg1.astype(self.error_dtype, copy=False) / scale))
+
+    def initial_step(self) -> float:
+        """Initial step size, after Hairer, Norsett & Wanner, II.4."""
+        scale = self.atol + np.abs(self.y) * self.rtol
+        d0 = self.norm(self.y / scale)
+        d1 = self.norm(self.f / scale)
+        h0 = 1e-6 if d0 < 1e-5 or d1 < 1e-5 else 0.01 * d0 / d1
+        h0 = min(h0, self.t_bound - self.t)
+        f1 = self.rhs(self.y + h0 * self.f, self.t + h0)
+        d2 = self.norm((f1 - self.f) / scale) / h0
+        if d1 <= 1e-15 and d2 <= 1e-15:
+            h1 = max(1e-6, h0 * 1e-3)
+        else:
+            h1 = (0.01 / max(d1, d2)) ** (1 / (self.order + 1))
+        return min(100 * h0, h1, self.max_step)
+
+    def attempt(self, h: float) -> list:
+        raise NotImplementedError
+
+    def dense_output(self, t: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def step(self):
+        """Advance by one accepted step, shrinking h until the error test passes."""
+        # A Python float, which leaves float32 states float32
+        h = float(min(self.h, self.max_step, self.t_bound - self.t))
+        if h <= 0:
+            raise RuntimeError('Integrator reached t_bound=%s.' % self.t_bound)
+        while True:
+            if h < 10 * np.spacing(self.t):
+                raise RuntimeError('Step size underflow at t=%s.' % self.t)
+            y_new, f_new, error = self.attempt(h)
+            if error <= 1:
+                break
+            self.nrejected += 1
+            h *= max(self.min_factor, self.safety * error ** (-1 / (self.order + 1)))
+        self.naccepted += 1
+        factor = self.max_factor if error == 0 else self.safety * error ** (-1 / (self.order + 1))
+        self.t_old, self.y_old = self.t, self.y
+        self.t = self.t_bound if h == self.t_bound - self.t else self.t + h
+        self.y, self.f = y_new, f_new
+        self.h_last = h
+        self.h = h * min(self.max_factor, max(self.min_factor, factor))
+
+    def info(self) -> dict:
+        return {'nfev': self.nfev, 'naccepted': self.naccepted, 'nrejected': self.nrejected}
+
+    def state(self) -> dict:
+        """Everything later steps depend on, as arrays and numbers: the step, counters, last two states and stages."""
+        return {name: value for name, value in vars(self).items() if name not in self.fixed and value is not None}
+
+    def restore(self, state: dict):
+        """Continue from a state() of an integrator of the same class, function, arguments and options.
+
+        Steps taken afterwards, and dense output within the last step, are
+        the same, bit for bit, as those of the integrator state came from.
+        """
+        for name, value in state.items():
+            setattr(self, name, value)
+
+
+class DormandPrince(Integrator):
+
+    """Dormand-Prince 5(4) integrator
+
+    Embedded explicit Runge-Kutta stepper with rtol/atol error control and
+    4th order dense output. Steps are taken as large as the error estimate
+    allows, so slow phases are crossed in a few steps and spikes are
+    resolved with many, independently of the output grid.
+
+    `Dormand & Prince (1980) <https://doi.org/10.1016/0771-050X(80)90013-3>`_
+    """
+
+    order = 4
+    C = np.array([0, 1/5, 3/10, 4/5, 8/9, 1])
+    A = [np.array([]),
+         np.array([1/5]),
+         np.array([3/40, 9/40]),
+         np.array([44/45, -56/15, 32/9]),
+         np.array([19372/6561, -25360/2187, 64448/6561, -212/729]),
+         np.array([9017/3168, -355/33, 46732/5247, 49/176, -5103/18656])]
+    B = np.array([35/384, 0, 500/1113, 125/192, -2187/6784, 11/84])
+    E = np.array([-71/57600, 0, 71/16695, -71/1920, 17253/339200, -22/525, 1/40])
+    P = np.array([
+        [1, -8048581381/2820520608, 8663915743/2820520608, -12715105075/11282082432],
+        [0, 0, 0, 0],
+        [0, 131558114200/32700410799, -68118460800/10900136933, 87487479700/32700410799],
+        [0, -1754552775/470086768, 14199869525/1410260304, -10690763975/1880347072],
+        [0, 127303824393/49829197408, -318862633887/49829197408, 701980252875/199316789632],
+        [0, -282668133/205662961, 2019193451/616988883, -1453857185/822651844],
+        [0, 40617522/29380423, -110615467/29380423, 69997945/29380423]])
+
+    def __init__(self, func, y0, t0=0., args=(), **options):
+        super().__init__(func, y0, t0, args, **options)
+        self.K = np.empty((len(self.B) + 1,) + self.y.shape, self.dtype)
+        if self.dtype != np.float64:
+            # Tableau in the state's precision, so stages are not promoted back to float64
+            self.A = [a.astype(self.dtype) for a in self.A]
+            self.B, self.P = self.B.astype(self.dtype), self.P.astype(self.dtype)
+        self.E = self.E.astype(self.error_dtype, copy=False)
+
+    def attempt(self, h: float) -> list:
+        """Take one trial step of size h, filling the stages in K."""
+        K = self.K
+        K[0] = self.f
+        for s in range(1, len(self.C)):
+            dy = np.tensordot(self.A[s], K[:s], axes=1) * h
+            K[s] = self.rhs(self.y + dy, self.t + self.C[s] * h)
+        y_new = self.y + h * np.tensordot(self.B, K[:-1], axes=1)
+        K[-1] = self.rhs(y_new, self.t + h)
+        error = self.error_norm(h * np.tensordot(self.E, K, axes=1), y_new)
+        return [y_new, K[-1].copy(), error]
+
+    def dense_output(self, t: np.ndarray) -> np.ndarray:
+        """Dense output.
+
+        Interpolates the last accepted step at times within [t_old, t].
+
+        Parameters
+        ----------
+        t
+            Time points to interpolate.
+
+        Returns
+        -------
+        np.ndarray
+            Interpolated states, shape [len(t)] + state shape.
+
+        """
+        t = np.asarray(t, dtype=np.float64)
+        if self.naccepted == 0:
+            return np.broadcast_to(self.y, t.shape + self.y.shape).copy()
+        theta = ((t - self.t_old) / self.h_last).astype(self.dtype, copy=False)
+        powers = np.cumprod(np.repeat(theta[:, None], self.P.shape[1], axis=1), axis=1)
+        Q = np.tensordot(self.P.T, self.K, axes=1)
+        return self.y_old + self.h_last * np.tensordot(powers, Q, axes=1)
+
+
+class Implicit(Integrator):
+
+    """Implicit integrator base class
+
+    Stiff stepper solving linear systems with the Jacobian of func, which
+    is evaluated once per step. jac(y, t, *args) returns the [d, d] (or
+    [d, d, N] for a batch) Jacobian. Without it the Jacobian is estimated
+    by forward differences.
+    """
+
+    uses_jacobian = True
+
+    def __init__(self, func, y0, t0=0., args=(), jac=None, **options):
+        self.jac = jac
+        self.J_t = None
+        self.njev = 0
+        self.nlu = 0
+        super().__init__(func, y0, t0, args, **options)
+
+    def jacobian(self, y, t):
+        self.njev += 1
+        if self.jac is not None:
+            return self.jac(y, t, *self.args)
+        columns = []
+        for j in range(len(y)):
+            # Scaled to the dtype's resolution, and divided by the step y[j] actually took after rounding
+            shifted = y.copy()
+            shifted[j] += np.sqrt(np.finfo(self.dtype).eps) * np.maximum(1, np.abs(y[j]))
+            delta = shifted[j] - y[j]
+            columns.append((self.rhs(shifted, t) - self.f) / delta)
+        return np.stack(columns, axis=1)
+
+    def inverse(self, arg1, J):
+        """Inverse of arg1*I - J, stacked [N, d, d] for a batch."""
+        self.nlu += 1
+        if J.ndim == 3:
+            J = J.transpose(2, 0, 1)
+        return np.linalg.inv(arg1 * np.eye(J.shape[-1], dtype=J.dtype) - J)
+
+    def apply(self, W_inv, arg1):
+        if W_inv.ndim == 3:
+            return np.einsum('nij,jn->in', W_inv, arg1)
+        return W_inv @ arg1
+
+    def info(self) -> dict:
+        info = super().info()
+        info.update(njev=self.njev, nlu=self.nlu)
+        return info
+
+
+class Rosenbrock(Implicit):
+
+    """Rosenbrock 2(3) integrator
+
+    Linearly implicit stiff stepper (the ode23s scheme) with rtol/atol
+    error control and 2nd order dense output. Each step evaluates the
+    Jacobian once and solves with W = I - h*d*J, so stiff systems can take
+    steps far beyond the explicit stability limit.
+
+    Being 2nd order, it pays off at loose tolerances, and defaults to
+    those of ode23s, rtol=1e-3 and atol=1e-6. At tight tolerances the step
+    count grows quickly; use Radau there.
+
+    `Shampine & Reichelt (1997) <https://doi.org/10.1137/S1064827594276424>`_
+    """
+
+    order = 2
+    rtol = 1e-3
+    atol = 1e-6
+    d = float(1 / (2 + np.sqrt(2)))
+    e32 = float(6 + np.sqrt(2))
+
+    def attempt(self, h: float) -> list:
+        """Take one trial step of size h."""
+        if self.J_t != self.t:
+            self.J, self.J_t = self.jacobian(self.y, self.t).astype(self.dtype, copy=False), self.t
+            delta = np.sqrt(np.finfo(np.float64).eps) * max(1, abs(self.t))
+            self.T = ((self.rhs(self.y, self.t + delta) - self.f) / delta).astype(self.dtype, copy=False)
+        W_inv = self.inverse(1, h * self.d * self.J)
+        hdT = h * self.d * self.T
+        F0 = self.f
+        k1 = self.apply(W_inv, F0 + hdT)
+        F1 = self.rhs(self.y + 0.5 * h * k1, self.t + 0.5 * h)
+        k2 = self.apply(W_inv, F1 - k1) + k1
+        y_new = self.y + h * k2
+        F2 = self.rhs(y_new, self.t + h)
+        k3 = self.apply(W_inv, F2 - self.e32 * (k2 - F1) - 2 * (k1 - F0) + hdT)
+        self.k1, self.k2 = k1, k2
+        error = self.error_norm(h / 6 * (k1.astype(self.error_dtype, copy=False) - 2 * k2 + k3), y_new)
+        return [y_new, F2, error]
+
+    def dense_output(self, t: np.ndarray) -> np.ndarray:
+        """Dense output.
+
+        Interpolates the last accepted step at times within [t_old, t].
+
+        Parameters
+        ----------
+        t
+            Time points to interpolate.
+
+        Returns
+        -------
+        np.ndarray
+            Interpolated states, shape [len(t)] + state shape.
+
+        """
+        t = np.asarray(t, dtype=np.float64)
+        if self.naccepted == 0:
+            return np.broadcast_to(self.y, t.shape + self.y.shape).copy()
+        s = ((t - self.t_old) / self.h_last).astype(self.dtype, copy=False).reshape((-1,) + (1,) * self.y.ndim)
+        c1 = s * (1 - s) / (1 - 2 * self.d)
+        c2 = s * (s - 2 * self.d) / (1 - 2 * self.d)
+        return self.y_old + self.h_last * (c1 * self.k1 + c2 * self.k2)
+
+
+class Radau(Implicit):
+
+    """Radau IIA 5 integrator
+
+    Fully implicit, L-stable collocation stepper of order 5, with rtol/atol
+    error control from an embedded 3rd order estimate and 3rd order dense
+    output from the collocation polynomial. The three stages are solved by
+    simplified Newton iterations, which the eigenvalues of the tableau
+    split into one real and one complex [d, d] system. Its order keeps the
+    step count low at tight tolerances, where Rosenbrock's is not. At the
+    default tolerances it is slower than dopri5 on HodgkinHuxley, which is
+    not stiff enough for the cheaper Newton steps to pay off, use it for
+    stiff systems such as Vanderpol with a large mu or HIV.
+
+    A step whose Newton iterations do not converge is rejected like one
+    that fails the error test.
+
+    `Hairer & Wanner (1996), IV.8 <https://doi.org/10.1007/978-3-642-05221-7>`_
+    """
+
+    # Of the error estimate, which sets the step size control
+    order = 3
+    newton_maxiter = 6
+    C = np.array([(4 - np.sqrt(6)) / 10, (4 + np.sqrt(6)) / 10, 1])
+    E = np.array([-13 - 7 * np.sqrt(6), -13 + 7 * np.sqrt(6), -1]) / 3
+    # Eigenvalues of the inverse tableau, one real and a complex conjugate pair
+    mu_real = 3 + 3 ** (2 / 3) - 3 ** (1 / 3)
+    mu_complex = 3 + 0.5 * (3 ** (1 / 3) - 3 ** (2 / 3)) - 0.5j * (3 ** (5 / 6) + 3 ** (7 / 6))
+    # Its eigenvectors V, and the rows of V^-1 giving the real and complex systems
+    V = np.array([
+        [0.09443876248897524, -0.14125529502095421, 0.03002919410514742],
+        [0.25021312296533332, 0.20412935229379994, -0.38294211275726192],
+        [1, 1, 0]])
+    V_real = np.array([4.17871859155190428, 0.32768282076106237, 0.52337644549944951])
+    V_complex = np.array([-4.17871859155190428, -0.32768282076106237, 0.47662355450055044]) \
+        + 1j * np.array([0.50287263494578682, -2.57192694985560522, 0.59603920482822492])
+    P = np.array([
+        [13 / 3 + 7 * np.sqrt(6) / 3, -23 / 3 - 22 * np.sqrt(6) / 3, 10 / 3 + 5 * np.sqrt(6)],
+        [13 / 3 - 7 * np.sqrt(6) / 3, -23 / 3 + 22 * np.sqrt(6) / 3, 10 / 3 - 5 * np.sqrt(6)],
+        [1 / 3, -8 / 3, 10 / 3]])
+
+    def __init__(self, func, y0, t0=0., args=(), jac=None, **options):
+        super().__init__(func, y0, t0, args, jac, **options)
+        if self.dtype != np.float64:
+            self.V, self.V_real, self.P = self.V.astype(self.dtype), self.V_real.astype(self.dtype), \
+                self.P.astype(self.dtype)
+            self.V_complex = self.V_complex.astype(np.result_type(self.dtype, np.complex64))
+        self.E = self.E.astype(self.error_dtype, copy=False)
+        self.Z = np.zeros((3,) + self.y.shape, self.dtype)
+        # Whether the last Newton iterations converged slowly, asking for a new Jacobian
+        self.slow = True
+        # Step size and Jacobian time the inverses were computed for
+        self.inverse_h = self.inverse_t = None
+
+    def newton(self, h: float) -> list:
+        """Simplified Newton iterations for the stages Z = y(t + C*h) - y, and whether they converged."""
+        if self.inverse_h != h or self.inverse_t != self.J_t:
+            self.real_inv = self.inverse(self.mu_real / h, self.J)
+            self.complex_inv = self.inverse(self.mu_complex / h, self.J)
+            self.inverse_h, self.inverse_t = h, self.J_t
+        # Start from the last step's collocation polynomial, extrapolated
+        Z = self.dense_output(self.t + self.C * h) - self.y
+        W_complex = np.tensordot(self.V_complex, Z, axes=1)
+        W = np.stack([np.tensordot(self.V_real, Z, axes=1), W_complex.real, W_complex.imag])
+        scale = self.atol + np.abs(self.y) * self.rtol
+        tol = max(10 * np.finfo(self.dtype).eps / self.rtol, min(0.03, self.rtol ** 0.5))
+        F = np.empty_like(Z)
+        rate = norm_old = None
+        for k in range(self.newton_maxiter):
+            for i in range(3):
+                F[i] = self.rhs(self.y + Z[i], self.t + self.C[i] * h)
+            if not np.all(np.isfinite(F)):
+                break
+            dW_real = self.apply(self.real_inv, np.tensordot(self.V_real, F, axes=1) - self.mu_real / h * W[0])
+            dW_complex = self.apply(self.complex_inv, np.tensordot(self.V_complex, F, axes=1)
+                                    - self.mu_complex / h * (W[1] + 1j * W[2]))
+            dW = np.stack([dW_real, dW_complex.real, dW_complex.imag])
+            dW_norm = self.norm((dW / scale).reshape((-1,) + self.y.shape[1:]))
+            if norm_old is not None:
+                rate = dW_norm / norm_old
+                if rate >= 1 or rate ** (self.newton_maxiter - k) / (1 - rate) * dW_norm > tol:
+                    break
+            W += dW
+            Z = np.tensordot(self.V, W, axes=1)
+            if dW_norm == 0 or rate is not None and rate / (1 - rate) * dW_norm < tol:
+                self.slow = k > 1 and rate > 1e-3
+                return [Z, True]
+            norm_old = dW_norm
+        return [Z, False]
+
+    def attempt(self, h: float) -> list:
+        """Take one trial step of size h.
+
+        The Jacobian is kept from step to step while the Newton iterations
+        converge fast, and evaluated again when they slow down or fail.
+        """
+        if self.J_t is None or self.J_t != self.t and self.slow:
+            self.J, self.J_t = self.jacobian(self.y, self.t).astype(self.dtype, copy=False), self.t
+        Z, converged = self.newton(h)
+        if not converged and self.J_t != self.t:
+            self.J, self.J_t = self.jacobian(self.y, self.t).astype(self.dtype, copy=False), self.t
+            Z, converged = self.newton(h)
+        if not converged:
+            self.slow = True
+            return [self.y, self.f, np.inf]
+        y_new = self.y + Z[-1]
+        ZE = np.tensordot(self.E, Z, axes=1) / h
+        error = self.apply(self.real_inv, self.f + ZE)
+        error_norm = self.error_norm(error, y_new)
+        if error_norm > 1:
+            # Filter the estimate through the stiff components once more before rejecting
+            error = self.apply(self.real_inv, self.rhs(self.y + error, self.t) + ZE)
+            error_norm = self.error_norm(error, y_new)
+        self.Z_new = Z
+        return [y_new, self.rhs(y_new, self.t + h) if error_norm <= 1 else self.f, error_norm]
+
+    def step(self):
+        """Advance by one accepted step, keeping its stages for the dense output.
+
+        A step size that would grow by less than a fifth is kept as it is,
+        so the inverses computed for it can be used again.
+        """
+        super().step()
+        self.Z = self.Z_new
+        if self.h_last <= self.h < 1.2 * self.h_last:
+            self.h = self.h_last
+
+    def dense_output(self, t: np.ndarray) -> np.ndarray:
+        """Dense output.
+
+        Evaluates the collocation polynomial of the last accepted step at
+        times within [t_old, t], or extrapolates it beyond.
+
+        Parameters
+        ----------
+        t
+            Time points to interpolate.
+
+        Returns
+        -------
+        np.ndarray
+            Interpolated states, shape [len(t)] + state shape.
+
+        """
+        t = np.asarray(t, dtype=np.float64)
+        if self.naccepted == 0:
+            return np.broadcast_to(self.y, t.shape + self.y.shape).copy()
+        x = ((t - self.t_old) / self.h_last).astype(self.dtype, copy=False)
+        powers = np.cumprod(np.repeat(x[:, None], 3, axis=1), axis=1)
+        Q = np.tensordot(self.P.T, self.Z, axes=1)
+        return self.y_old + np.tensordot(powers, Q, axes=1)
+
+
+SOLVERS = {
+    'dopri5': DormandPrince,
+    'radau': Radau,
+    'rosenbrock': Rosenbrock,
+}
+
+
+class Event:
+
+    """Event
+
+    Crossing of a threshold by one component of the state, in the given
+    direction: 1 for rising, -1 for falling, 0 for both. A terminal event
+    stops the integration after it has occurred that many times (once
+    for True).
+    """
+
+    def __init__(self, component=0, threshold=0., direction=1, terminal=False):
+        self.component = component
+        self.threshold = threshold
+        self.direction = direction
+        self.terminal = terminal
+
+    def __call__(self, y: np.ndarray) -> float:
+        return y[self.component] - self.threshold
+
+    def crosses(self, g0: float, g1: float) -> bool:
+        rising = g0 < 0 <= g1
+        falling = g0 > 0 >= g1
+        return rising if self.direction > 0 else falling if self.direction < 0 else rising or falling
+
+
+class EventLocator:
+
+    """Event locator
+
+    Called after every accepted step, checks each event for a sign change
+    over the step and locates the crossing by root finding on the step's
+    dense output, so events are found to xtol regardless of the output grid.
+
+    `brentq <https://docs.scipy.org/doc/scipy/reference/generated/scipy.optimize.brentq.html>`_
+
+    Events are evaluated on converter(y), e.g. a model's output_converter,
+    and the recorded states are the converted states.
+    """
+
+    def __init__(self, integrator, events, converter=None, xtol=1e-10):
+        self.events = events
+        self.converter = (lambda y: y) if converter is None else converter
+        self.xtol = xtol
+        self.times = [[] for _ in events]
+        self.states = [[] for _ in events]
+        y = self.converter(integrator.y.copy())
+        self.dimension = len(y)
+        self.values = [event(y) for event in events]
+
+    def state(self, integrator, t):
+        return self.converter(integrator.dense_output(np.array([t]))[0])
+
+    def __call__(self, integrator) -> bool:
+        """Record the events in the last step, True once a terminal event says stop."""
+        from scipy.optimize import brentq
+
+        y = self.converter(integrator.y.copy())
+        stop = False
+        for k, event in enumerate(self.events):
+            g0, g1 = self.values[k], event(y)
+            self.values[k] = g1
+            if not event.crosses(g0, g1):
+                continue
+            if g1 == 0:
+                root = integrator.t
+            else:
+                root = brentq(lambda t: event(self.state(integrator, t)), integrator.t_old, integrator.t,
+                              xtol=self.xtol)
+            self.times[k].append(root)
+            self.states[k].append(self.state(integrator, root))
+            if event.terminal and len(self.times[k]) >= event.terminal:
+                stop = True
+        return stop
+
+    def results(self) -> list:
+        """Event times [k] and states [k, d] for each event."""
+        return [(np.array(times), np.array(states).reshape(len(times), self.dimension))
+                for times, states in zip(self.times, self.states)]
+
+
+def integrate(integrator, t: np.ndarray, out: np.ndarray = None, on_step=None) -> np.ndarray:
+    """Integrate.
+
+    Steps the integrator until the last requested time and samples every
+    requested time from the dense output of the step that covers it.
+
+    Parameters
+    ----------
+    integrator
+        Integrator positioned at t[0].
+    t
+        Increasing output time points.
+    out
+        Optional [T] + state shape array to write the solution into.
+    on_step
+        Optional callable, called with the integrator after every accepted
+        step. Returning True stops the integration early, and only the
+        time points reached so far are returned.
+
+    Returns
+    -------
+    np.ndarray
+        Solution at each time point, shape [T] + state shape.
+
+    """
+    if out is None:
+        out = np.empty((len(t),) + integrator.y.shape, integrator.dtype)
+    i = 0
+    while True:
+        j = np.searchsorted(t, integrator.t, side='right')
+        if j > i:
+            out[i:j] = integrator.dense_output(t[i:j])
+            i = j
+        if i == len(t):
+            return out
+        integrator.step()
+        if on_step is not None and on_step(integrator):
+            j = np.searchsorted(t, integrator.t, side='right')
+            out[i:j] = integrator.dense_output(t[i:j])
+            return out[:j]
+
+
+def advance(integrator, t_end: float, on_step=None):
+    """Advance.
+
+    Steps the integrator to t_end without sampling any output.
+
+    Parameters
+    ----------
+    integrator
+        Integrator to step.
+    t_end
+        Time to stop at, at most the integrator's t_bound.
+    on_step
+        Optional callable, called with the integrator after every accepted
+        step. Returning True stops early.
+
+    """
+    while integrator.t < t_end:
+        integrator.step()
+        if on_step is not None and on_step(integrator):
+            return
@@ -0,0 +1,262 @@
+import math
+import types
+
+import numba
+import numpy as np
+
+
+# Compiled right hand sides, one per model, selected by index inside rhs so
+# that the integrator loops only call module level functions and can be
+# cached on disk across processes. Each one must match the equations of its
+# fizzpy.core model, which benchmarks/bench_solve.py checks.
+COUPLED_DAMPED_SHM, DAMPED_SHM, FITZHUGH_NAGUMO, HINDMARSH_ROSE, HODGKIN_HUXLEY, HIV, LORENZ, MORRIS_LECAR, \
+    RIKITAKE, VANDERPOL = range(10)
+
+KERNELS = {
+    'CoupledDampedSHM': COUPLED_DAMPED_SHM,
+    'DampedSHM': DAMPED_SHM,
+    'FitzhughNagumo': FITZHUGH_NAGUMO,
+    'HindmarshRose': HINDMARSH_ROSE,
+    'HodgkinHuxley': HODGKIN_HUXLEY,
+    'HIV': HIV,
+    'Lorenz': LORENZ,
+    'MorrisLecar': MORRIS_LECAR,
+    'Rikitake': RIKITAKE,
+    'Vanderpol': VANDERPOL,
+}
+
+
+@numba.njit(cache=True)
+def rhs(kernel, y, t, p, dy):
+    """Evaluate the equations of model kernel at y into dy, allocation free."""
+    if kernel == COUPLED_DAMPED_SHM:
+        dy[0] = y[1]
+        dy[1] = -(p[1] / p[3]) * y[0] + (p[2] / p[3]) * y[2] - (p[0] / p[3]) * y[1]
+        dy[2] = y[3]
+        dy[3] = (p[2] / p[3]) * y[0] - (p[1] / p[3]) * y[2] - (p[0] / p[3]) * y[3]
+    elif kernel == DAMPED_SHM:
+        dy[0] = y[1]
+        dy[1] = (-p[0] * y[1] - p[1] * y[0]) / p[2]
+    elif kernel == FITZHUGH_NAGUMO:
+        v, w = y[0], y[1]
+        dy[0] = p[2] * (v + w - (v**3/3) + p[3])
+        dy[1] = -1/p[2] * (v - p[0] + p[1]*w)
+    elif kernel == HINDMARSH_ROSE:
+        x, z = y[0], y[2]
+        dy[0] = y[1] - p[0] * (x ** 3) + (p[1] * (x ** 2)) - z + p[6]
+        dy[1] = p[2] - p[3] * (x ** 2) - y[1]
+        dy[2] = p[4] * (p[5] * (x - p[7]) - z)
+    elif kernel == HODGKIN_HUXLEY:
+        i, n, m, h = y[0], y[1], y[2], y[3]
+        alpha_n = (0.01 * (i + 10)) / (math.exp((i + 10) / 10) - 1)
+        beta_n = 0.125 * math.exp(i / 80)
+        alpha_m = (0.1 * (i + 25)) / (math.exp((i + 25) / 10) - 1)
+        beta_m = 4 * math.exp(i / 18)
+        alpha_h = (0.07 * math.exp(i / 20))
+        beta_h = 1 / (math.exp((i + 30) / 10) + 1)
+        dy[0] = (p[0] * (n ** 4) * (i - p[3])
+                 + p[1] * (m ** 3) * h * (i - p[4])
+                 + p[2] * (i - p[5])
+                 - p[7]) * (-1 / p[6])
+        dy[1] = alpha_n * (1 - n) - beta_n * n
+        dy[2] = alpha_m * (1 - m) - beta_m * m
+        dy[3] = alpha_h * (1 - h) - beta_h * h
+    elif kernel == HIV:
+        x1, x2, x3 = y[0], y[1], y[2]
+        dy[0] = -p[1] * x1 - p[4] * x1 * x3 + p[0]
+        dy[1] = -p[3] * x2 + p[4] * x1 * x3
+        dy[2] = p[5] * x2 - p[2] * x3
+    elif kernel == LORENZ:
+        x, y1, z = y[0], y[1], y[2]
+        dy[0] = p[1] * (y1 - x)
+        dy[1] = x * (p[0] - z) - y1
+        dy[2] = x * y1 - p[2] * z
+    elif kernel == MORRIS_LECAR:
+        v, n = y[0], y[1]
+        dy[0] = (-p[3] * (0.5 * (1 + math.tanh((v - p[7]) / p[8]))) * (v - p[2])
+                 - p[1] * n * (v - p[0]) - p[5] * (v - p[4]) + p[11])
+        dy[1] = (p[6] * ((0.5 * (1 + math.tanh((v - p[9]) / p[10]))) - n)) \
+            / (1 / math.cosh((v - p[9]) / (2 * p[10])))
+    elif kernel == RIKITAKE:
+        dy[0] = p[2] * (y[3] - y[0])
+        dy[1] = p[2] * (y[2] - y[1])
+        dy[2] = y[0] * y[4] + p[0] * y[1] - (1 + p[0]) * y[2]
+        dy[3] = y[1] * y[5] + p[0] * y[0] - (1 + p[0]) * y[3]
+        dy[4] = p[1] * (1 - (1 + p[0]) * y[0] * y[2] + p[0] * y[0] * y[1]) - p[3] * y[4]
+        dy[5] = p[1] * (1 - (1 + p[0]) * y[1] * y[3] + p[0] * y[1] * y[0]) - p[3] * y[5]
+    elif kernel == VANDERPOL:
+        dy[0] = y[1]
+        dy[1] = p[0]*y[1]*(1 - y[0]**2) - y[0]
+
+
+def _euler(kernel, y0, t, p, substeps, out):
+    """Forward Euler, substeps steps per interval of t, writing [N, d, T] into out."""
+    d = y0.shape[1]
+    y = np.empty(d)
+    k1 = np.empty(d)
+    for trajectory in range(y0.shape[0]):
+        q = p[trajectory]
+        y[:] = y0[trajectory]
+        out[trajectory, :, 0] = y
+        for j in range(len(t) - 1):
+            h = (t[j + 1] - t[j]) / substeps
+            for step in range(substeps):
+                s = t[j] + step * h
+                rhs(kernel, y, s, q, k1)
+                for m in range(d):
+                    y[m] += h * k1[m]
+            out[trajectory, :, j + 1] = y
+
+
+def _rk2(kernel, y0, t, p, substeps, out):
+    """Explicit midpoint, substeps steps per interval of t, writing [N, d, T] into out."""
+    d = y0.shape[1]
+    y = np.empty(d)
+    k1 = np.empty(d)
+    k2 = np.empty(d)
+    stage = np.empty(d)
+    for trajectory in range(y0.shape[0]):
+        q = p[trajectory]
+        y[:] = y0[trajectory]
+        out[trajectory, :, 0] = y
+        for j in range(len(t) - 1):
+            h = (t[j + 1] - t[j]) / substeps
+            for step in range(substeps):
+                s = t[j] + step * h
+                rhs(kernel, y, s, q, k1)
+                for m in range(d):
+                    stage[m] = y[m] + 0.5 * h * k1[m]
+                rhs(kernel, stage, s + 0.5 * h, q, k2)
+                for m in range(d):
+                    y[m] += h * k2[m]
+            out[trajectory, :, j + 1] = y
+
+
+def _rk4(kernel, y0, t, p, substeps, out):
+    """Classical Runge-Kutta, substeps steps per interval of t, writing [N, d, T] into out."""
+    d = y0.shape[1]
+    y = np.empty(d)
+    k1 = np.empty(d)
+    k2 = np.empty(d)
+    k3 = np.empty(d)
+    k4 = np.empty(d)
+    stage = np.empty(d)
+    for trajectory in range(y0.shape[0]):
+        q = p[trajectory]
+        y[:] = y0[trajectory]
+        out[trajectory, :, 0] = y
+        for j in range(len(t) - 1):
+            h = (t[j + 1] - t[j]) / substeps
+            for step in range(substeps):
+                s = t[j] + step * h
+                rhs(kernel, y, s, q, k1)
+                for m in range(d):
+                    stage[m] = y[m] + 0.5 * h * k1[m]
+                rhs(kernel, stage, s + 0.5 * h, q, k2)
+                for m in range(d):
+                    stage[m] = y[m] + 0.5 * h * k2[m]
+                rhs(kernel, stage, s + 0.5 * h, q, k3)
+                for m in range(d):
+                    stage[m] = y[m] + h * k3[m]
+                rhs(kernel, stage, s + h, q, k4)
+                for m in range(d):
+                    y[m] += h / 6 * (k1[m] + 2 * k2[m] + 2 * k3[m] + k4[m])
+            out[trajectory, :, j + 1] = y
+
+
+euler = numba.njit(cache=True)(_euler)
+rk2 = numba.njit(cache=True)(_rk2)
+rk4 = numba.njit(cache=True)(_rk4)
+
+# Integrator loop and number of right hand side evaluations per step
+SOLVERS = {'euler': (euler, 1), 'rk2': (rk2, 2), 'rk4': (rk4, 4)}
+
+# Integrator loops compiled around generated equations, by solver and equations
+specialized = {}
+
+
+def specialize(solver: str, equations):
+    """Compile the integrator loop of solver calling equations in place of rhs.
+
+    Used for equations generated at run time, e.g. by fizzpy.symbolic,
+    which cannot be cached on disk.
+    """
+    key = solver, equations
+    if key not in specialized:
+        loop = SOLVERS[solver][0].py_func
+        namespace = dict(loop.__globals__, rhs=numba.njit(equations))
+        specialized[key] = numba.njit(types.FunctionType(loop.__code__, namespace, loop.__name__))
+    return specialized[key]
+
+
+def kernel(model) -> int:
+    """Index of the compiled right hand side of model, looked up along its class hierarchy.
+
+    The kernels are copies of the equations of the fizzpy.core models, so a
+    subclass only gets its parent's kernel if it does not override equations.
+    """
+    for cls in type(model).__mro__:
+        if cls.__name__ in KERNELS and cls.__module__ == 'fizzpy.core':
+            if type(model).equations is not cls.equations:
+                raise ValueError('%s overrides the equations of %s, which the numba backend has compiled, '
+                                 'solve it with the numpy backend.' % (type(model).__name__, cls.__name__))
+            return KERNELS[cls.__name__]
+    raise ValueError('%s has no compiled equations for the numba backend.' % type(model).__name__)
+
+
+def solve(model, arg1: np.ndarray, arg2: np.ndarray, t: np.ndarray, solver='rk4', substeps=1,
+          dtype=np.float64) -> list:
+    """Compiled fixed step solver.
+
+    The loops and the model's right hand side are compiled by Numba on
+    first use and cached on disk, so later processes load the machine
+    code instead of compiling again. Steps are always taken in float64
+    and only the output is stored as dtype, so float32 halves its memory
+    at the cost of rounding each stored point, without slowing the loop
+    down with conversions or letting rounding errors accumulate.
+
+    `Numba <https://numba.readthedocs.io/en/stable/user/jit.html>`_
+
+    Parameters
+    ----------
+    model
+        Model whose equations to solve.
+    arg1
+        Initial conditions, shape [N, d].
+    arg2
+        Model parameters, shape [N, p].
+    t
+        Time points to solve for.
+    solver
+        'euler', 'rk2' or 'rk4'.
+    substeps
+        Fixed steps taken per interval of t.
+    dtype
+        Floating point type of the output, float64 or float32.
+
+    Returns
+    -------
+    list
+        y: solved state for each time point, shape [N, d, T].
+        info_dict: nfev and naccepted for each trajectory.
+
+    """
+    if solver not in SOLVERS:
+        raise ValueError('Unknown solver %r for the numba backend, expected one of %s.' % (solver, sorted(SOLVERS)))
+    if substeps < 1:
+        raise ValueError('substeps must be at least 1.')
+    dtype = np.dtype(dtype)
+    if dtype not in (np.float32, np.float64):
+        raise ValueError('Unsupported dtype %s for the numba backend, expected float32 or float64.' % dtype)
+    integrator, stages = SOLVERS[solver]
+    if hasattr(model, 'jit_equations'):
+        equations, arg2 = model.jit_equations(arg2)
+        integrator, index = specialize(solver, equations), 0
+    else:
+        index = kernel(model)
+    out = np.empty(arg1.shape + (len(t),), dtype)
+    integrator(index, np.ascontiguousarray(arg1, dtype=np.float64),
+               np.ascontiguousarray(t, dtype=np.float64), np.ascontiguousarray(arg2, dtype=np.float64),
+               substeps, out)
+    steps = substeps * max(len(t) - 1, 0)
+    return [out, {'nfev': stages * steps, 'naccepted': steps}]
@@ -0,0 +1,120 @@
+import numpy as np
+
+from fizzpy.backends import numpy_integrator
+from fizzpy.integrators import advance
+
+
+def variational(model, dimension: int):
+    """Variational equations.
+
+    The model's equations extended with the tangent-linear system
+    dQ = J(y) Q, for d tangent vectors stacked after the state. Without
+    an analytic jacobian, J(y) Q is estimated by one forward difference
+    of the equations along each tangent vector.
+
+    Parameters
+    ----------
+    model
+        Model whose equations to extend.
+    dimension
+        State dimension d.
+
+    Returns
+    -------
+    callable
+        Equations of the [d + d * d] or [d + d * d, N] extended state,
+        called as (state, t, p, ops).
+
+    """
+    d = dimension
+
+    def equations(state, t, p, ops):
+        y = state[:d]
+        Q = state[d:].reshape((d, d) + state.shape[1:])
+        f = model.equations(y, t, p, ops)
+        if model.jacobian is not None:
+            J = np.broadcast_to(model.jacobian(y, t, p, ops), (d, d) + state.shape[1:])
+            dQ = np.einsum('ij...,jk...->ik...', J, Q)
+        else:
+            dQ = np.empty_like(Q)
+            for k in range(d):
+                q = Q[:, k]
+                h = np.sqrt(np.finfo(float).eps) * (1 + np.linalg.norm(y, axis=0)) \
+                    / np.maximum(np.linalg.norm(q, axis=0), np.finfo(float).tiny)
+                dQ[:, k] = (model.equations(y + h * q, t, p, ops) - f) / h
+        return np.concatenate([f, dQ.reshape((d * d,) + state.shape[1:])])
+    return equations
+
+
+def spectrum(model, arg1: np.ndarray, arg2: np.ndarray, duration: float, interval: float = 1.,
+             transient: float = 0., solver='dopri5', stats=None, **options) -> np.ndarray:
+    """Lyapunov spectrum.
+
+    Integrates every trajectory of the batch together with d tangent
+    vectors, re-orthonormalizing them by QR decomposition every interval
+    time units and accumulating the logarithms of the diagonal of R. The
+    whole batch is integrated as one vectorized system, so a grid of
+    parameter points costs one integration rather than one per point.
+
+    `Benettin et al. (1980) <https://doi.org/10.1007/BF02128236>`_
+
+    Parameters
+    ----------
+    model
+        Model to characterize.
+    arg1
+        Initial conditions, shape [N, d].
+    arg2
+        Model parameters, shape [N, p].
+    duration
+        Time over which the exponents are averaged.
+    interval
+        Time between re-orthonormalizations.
+    transient
+        Time integrated first, without the tangent vectors, and discarded.
+    solver
+        NumPy integrator, 'dopri5', 'rosenbrock' or 'radau'.
+    stats
+        Optional fizzpy.profiling.SolveStats to add the solver's counters
+        and time to.
+    options
+        Solver keyword arguments, e.g. rtol and atol.
+
+    Returns
+    -------
+    np.ndarray
+        Lyapunov exponents of each trajectory, largest first, shape [N, d].
+
+    """
+    if solver is None or solver == 'odeint':
+        raise ValueError('The Lyapunov spectrum needs an integrator, e.g. dopri5 or rosenbrock.')
+    batch, d = arg1.shape
+    y = np.ascontiguousarray(arg1.T, dtype=np.float64)
+    p = np.ascontiguousarray(arg2.T, dtype=np.float64)
+    if transient > 0:
+        integrator = numpy_integrator(model.equations, y, p, 0., transient, solver, model.jacobian, **options)
+        advance(integrator, transient)
+        y = integrator.y
+        if stats is not None:
+            stats.add(integrator.info())
+
+    Q = np.repeat(np.eye(d)[:, :, None], batch, axis=2)
+    logs = np.zeros((d, batch))
+    equations = variational(model, d)
+    t, end, options = transient, transient + duration, dict(options)
+    while t < end:
+        t_next = min(t + interval, end)
+        integrator = numpy_integrator(equations, np.concatenate([y, Q.reshape(d * d, batch)]), p, t, t_next, solver,
+                                      **options)
+        advance(integrator, t_next)
+        options['first_step'] = integrator.h
+        if stats is not None:
+            stats.add(integrator.info())
+        y = integrator.y[:d]
+        q, r = np.linalg.qr(integrator.y[d:].reshape(d, d, batch).transpose(2, 0, 1))
+        diagonal = np.diagonal(r, axis1=1, axis2=2)
+        signs = np.where(diagonal < 0, -1., 1.)
+        logs += np.log(np.abs(diagonal)).T
+        Q = (q * signs[:, None, :]).transpose(1, 2, 0)
+        t = t_next
+    return -np.sort(-logs.T / duration, axis=1)
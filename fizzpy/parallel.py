@@ -0,0 +1,174 @@
+import copy
+import multiprocessing
+import os
+
+import numpy as np
+
+from fizzpy import profiling
+
+
+# Per-worker state, set once by the pool initializer
+_worker = {}
+
+# Rows per block of a sweep. Each block is one batch sharing its adaptive
+# step size, so the default must not depend on the number of workers.
+BLOCK_SIZE = 16
+
+
+def shared_array(shape: tuple, dtype=np.float64) -> list:
+    """Shared array.
+
+    Allocates an array in shared memory. Worker processes write
+    their results straight into it, so nothing is pickled on the way back.
+
+    Parameters
+    ----------
+    shape
+        Shape of the array.
+    dtype
+        Floating point type of the array.
+
+    Returns
+    -------
+    list
+        raw: the multiprocessing RawArray to hand to the workers.
+        array: ndarray view of it.
+
+    """
+    raw = multiprocessing.RawArray(np.ctypeslib.as_ctypes_type(np.dtype(dtype)), int(np.prod(shape)))
+    return [raw, np.frombuffer(raw, dtype=dtype).reshape(shape)]
+
+
+def worker_model(model):
+    """Copy of model to send to worker processes, without its last solution or where that solve stopped."""
+    model = copy.copy(model)
+    for name in ('solution', 'continuation', 'integrator'):
+        model.__dict__.pop(name, None)
+    return model
+
+
+def _initializer(model, raw, shape, dtype, hooks=True):
+    if not hooks:
+        # Stats go back to the parent, which calls its hooks, rather than to copies of them here
+        del profiling.hooks[:]
+    _worker['model'] = model
+    if isinstance(raw, str):
+        _worker['output'] = np.load(raw, mmap_mode='r+')
+    else:
+        _worker['output'] = np.frombuffer(raw, dtype=dtype).reshape(shape)
+
+
+def _solve_block(start, stop, init_states, parameters, solver, options):
+    model = _worker['model']
+    output = _worker['output']
+    output[start:stop] = model.solve_batch(init_states, parameters, backend='numpy', solver=solver, drift_sample=0,
+                                           **options)
+    if isinstance(output, np.memmap):
+        output.flush()
+    return start, stop, model.stats
+
+
+def _run_block(task):
+    return _solve_block(*task)
+
+
+def _record(results, spans: list, finished: list, checkpoint, stats, emit: bool):
+    """Wait for the blocks, saving finished ones in the checkpoint and adding their counters to stats."""
+    for start, stop, block_stats in results:
+        finished.append(start)
+        if stats is not None:
+            stats.add(block_stats.info())
+        if emit:
+            profiling.emit(block_stats)
+        if checkpoint is not None and (checkpoint.due() or len(finished) == len(spans)):
+            done = sum(end - begin for begin, end in spans if begin in finished)
+            checkpoint.save(done, blocks=np.array(finished, dtype=np.int64))
+
+
+def blocks(size: int, workers: int, block_size: int = None) -> list:
+    """Split range(size) into contiguous [start, stop) blocks, one per worker by default."""
+    if block_size is None:
+        block_size = max(1, -(-size // max(1, workers)))
+    return [(start, min(start + block_size, size)) for start in range(0, size, block_size)]
+
+
+def sweep(model, init_states: np.ndarray, parameters: np.ndarray, workers: int = None, block_size: int = None,
+          solver=None, checkpoint=None, stats=None, **options) -> np.ndarray:
+    """Parameter sweep.
+
+    Solves one trajectory per row of init_states and parameters on a pool
+    of worker processes. Rows are split into contiguous blocks, each block
+    is solved as one vectorized NumPy batch, and the results are written
+    into shared memory at the block's rows, so the output order never
+    depends on which worker finishes first. A batch shares its adaptive
+    step size, so the results depend on block_size but not on the number
+    of workers, which only changes how the blocks are scheduled.
+
+    With a checkpoint the output is its .npy file instead, which workers
+    map and write to, and finished blocks are recorded in it, so running
+    the sweep again with the same arguments skips them.
+
+    Solutions are stored as options' dtype, float32 halving the output;
+    blocks do not measure their drift, see Model.precision_drift.
+
+    Parameters
+    ----------
+    model
+        Model to solve.
+    init_states
+        Initial conditions, shape [M, d].
+    parameters
+        Model parameters, shape [M, p].
+    workers
+        Number of worker processes, defaults to os.cpu_count(). With one
+        worker the sweep runs in this process.
+    block_size
+        Rows per task, defaults to BLOCK_SIZE.
+    solver
+        NumPy solver, see Model.solve.
+    checkpoint
+        Optional fizzpy.checkpoint.Checkpoint, or its directory.
+    stats
+        Optional fizzpy.profiling.SolveStats to add the blocks' counters
+        to. Each block's own stats are passed to the profiling hooks of
+        this process, not of the workers.
+    options
+        Solver keyword arguments, e.g. rtol and atol.
+
+    Returns
+    -------
+    np.ndarray
+        Solutions of shape [M, d, T], backed by shared memory, or the
+        checkpoint's memmap.
+
+    """
+    workers = os.cpu_count() if workers is None else workers
+    shape = init_states.shape + (model.time_steps,)
+    dtype = np.dtype(options.get('dtype', np.float64))
+    spans = blocks(len(init_states), workers, BLOCK_SIZE if block_size is None else block_size)
+    finished = []
+    if checkpoint is None:
+        raw, output = shared_array(shape, dtype)
+    else:
+        checkpoint = model.open_checkpoint(checkpoint, shape, solver, options, init_states, parameters, spans,
+                                           fortran_order=False, dtype=dtype)
+        raw, output = checkpoint.path('output.npy'), checkpoint.output
+        if checkpoint.state is not None:
+            finished = [int(start) for start in checkpoint.state['blocks']]
+    tasks = [(start, stop, init_states[start:stop], parameters[start:stop], solver, options)
+             for start, stop in spans if start not in finished]
+    if not tasks:
+        return output
+    if workers <= 1:
+        _initializer(model, raw, shape, dtype)
+        try:
+            # Blocks solved here already called the hooks
+            _record(map(_run_block, tasks), spans, finished, checkpoint, stats, False)
+        finally:
+            _worker.clear()
+        return output
+    initargs = (worker_model(model), raw, shape, dtype, False)
+    with multiprocessing.Pool(workers, initializer=_initializer, initargs=initargs) as pool:
+        _record(pool.imap_unordered(_run_block, tasks), spans, finished, checkpoint, stats, True)
+    return output
+
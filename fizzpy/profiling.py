@@ -0,0 +1,183 @@
+import contextlib
+
+import numpy as np
+
+
+# Callables called with the SolveStats of every finished solve
+hooks = []
+
+
+class SolveStats:
+
+    """Solve statistics
+
+    Work and time spent by one solve. Counters are None when the backend
+    does not report them. Function evaluations count calls to the
+    equations, each of which evaluates the whole batch. Times are wall
+    seconds: graph_build_time is spent compiling the Tensorflow graph (zero
+    once it is cached), integrate_time in the solver itself, session_time
+    in the backend session runner, and total_time in the whole solve.
+    drift is set for batches solved in reduced precision, see drift.
+    """
+
+    counters = ['nfev', 'njev', 'nlu', 'naccepted', 'nrejected']
+
+    def __init__(self, model=None, backend=None, solver=None, batch=1, time_steps=None):
+        self.model = model
+        self.backend = backend
+        self.solver = solver
+        self.batch = batch
+        self.time_steps = time_steps
+        self.cache_hit = False
+        self.nfev = None
+        self.njev = None
+        self.nlu = None
+        self.naccepted = None
+        self.nrejected = None
+        self.graph_build_time = 0.
+        self.integrate_time = 0.
+        self.session_time = 0.
+        self.total_time = 0.
+        self.drift = None
+
+    def update(self, info: dict):
+        """Set the counters from a solver info dict, see solver_counters."""
+        for name, value in solver_counters(info).items():
+            setattr(self, name, value)
+
+    def add(self, info: dict):
+        """Add the counters of a solver info dict, for solves restarted chunk by chunk."""
+        for name, value in solver_counters(info).items():
+            previous = getattr(self, name)
+            setattr(self, name, value if previous is None else previous + value)
+
+    def info(self) -> dict:
+        """The counters that are set, as an info dict, e.g. to add them to another solve's stats."""
+        return {name: getattr(self, name) for name in self.counters if getattr(self, name) is not None}
+
+    def as_dict(self) -> dict:
+        return dict(vars(self))
+
+    def __repr__(self):
+        return '%s(%s)' % (type(self).__name__, ', '.join('%s=%r' % item for item in vars(self).items()))
+
+
+def solver_counters(info: dict) -> dict:
+    """Solver counters.
+
+    Normalizes the info returned by SciPy odeint (full_output), Tensorflow
+    odeint (full_output) or fizzpy.integrators.
+
+    Parameters
+    ----------
+    info
+        Info dict returned by the solver.
+
+    Returns
+    -------
+    dict
+        The counters present, among nfev, njev, nlu, naccepted and nrejected.
+
+    """
+    if 'nfe' in info:
+        # SciPy odeint, cumulative per output point; nothing past the first point when len(t) < 2
+        if not len(info['nfe']):
+            return {'nfev': 0, 'njev': 0, 'naccepted': 0}
+        return {'nfev': int(info['nfe'][-1]), 'njev': int(info['nje'][-1]), 'naccepted': int(info['nst'][-1])}
+    if 'num_func_evals' in info:
+        # Tensorflow odeint, steps with an error ratio above one were rejected
+        error_ratio = np.asarray(info['error_ratio'])
+        return {'nfev': int(info['num_func_evals']), 'naccepted': int(np.sum(error_ratio <= 1)),
+                'nrejected': int(np.sum(error_ratio > 1))}
+    return {name: int(info[name]) for name in SolveStats.counters if name in info}
+
+
+def drift(arg1: np.ndarray, arg2: np.ndarray, rows=None) -> dict:
+    """Precision drift.
+
+    Compares reduced precision solutions with float64 solutions of the
+    same trajectories. Errors are scaled by each trajectory's amplitude in
+    each state component, the largest absolute value it reaches, so they
+    read as a fraction of the signal whatever its units. Phase errors of
+    oscillators show up as relative errors of order one long before the
+    amplitudes drift.
+
+    Parameters
+    ----------
+    arg1
+        Reduced precision solutions, shape [n, d, T].
+    arg2
+        float64 solutions of the same trajectories, shape [n, d, T].
+    rows
+        Optional indices of the trajectories in their batch.
+
+    Returns
+    -------
+    dict
+        max_abs: largest absolute error.
+        max_rel: largest relative error.
+        final_rel: largest relative error at the last time point.
+        component_rel: largest relative error of each state component.
+        onset: first time index where a relative error exceeds 1e-3, None if none does.
+        rows: the trajectories compared.
+
+    """
+    error = np.abs(np.asarray(arg1, dtype=np.float64) - arg2)
+    scale = np.abs(arg2).max(axis=-1, keepdims=True)
+    relative = error / np.where(scale > 0, scale, 1)
+    exceeded = np.flatnonzero(relative.max(axis=(0, 1)) > 1e-3)
+    return {'max_abs': float(error.max(initial=0)), 'max_rel': float(relative.max(initial=0)),
+            'final_rel': float(relative[..., -1].max(initial=0)),
+            'component_rel': relative.max(axis=(0, 2), initial=0).tolist(),
+            'onset': int(exceeded[0]) if len(exceeded) else None,
+            'rows': None if rows is None else [int(row) for row in rows]}
+
+
+def add_hook(hook):
+    """Call hook(stats) with the SolveStats of every solve from now on."""
+    hooks.append(hook)
+
+
+def remove_hook(hook):
+    hooks.remove(hook)
+
+
+def emit(stats: SolveStats):
+    """Pass the stats of a finished solve to every hook."""
+    for hook in list(hooks):
+        hook(stats)
+
+
+@contextlib.contextmanager
+def profile(hook=None):
+    """Profile.
+
+    Collects the stats of every solve run inside the with block.
+
+        with profiling.profile() as records:
+            model.solve(solver='dopri5')
+        records[0].nfev
+
+    Parameters
+    ----------
+    hook
+        Optional callable, also called with each SolveStats as it arrives,
+        e.g. to send it to a metrics client.
+
+    Yields
+    ------
+    list
+        The SolveStats of the solves run so far.
+
+    """
+    records = []
+
+    def collect(stats):
+        records.append(stats)
+        if hook is not None:
+            hook(stats)
+    add_hook(collect)
+    try:
+        yield records
+    finally:
+        remove_hook(collect)
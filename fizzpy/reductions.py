@@ -0,0 +1,141 @@
+import numpy as np
+
+
+class Reduction:
+
+    """Reduction base class
+
+    Streaming summary of a solution, updated one chunk of the time grid at
+    a time so the trajectory itself is never stored. Chunks are [k, d] for
+    a single solve and [k, N, d] for a batch, time first; results drop the
+    time axis, giving [d] or [N, d] shaped summaries.
+    """
+
+    def reset(self):
+        raise NotImplementedError
+
+    def update(self, t: np.ndarray, y: np.ndarray):
+        raise NotImplementedError
+
+    def result(self):
+        raise NotImplementedError
+
+
+class MeanVariance(Reduction):
+
+    """Mean and variance
+
+    Running mean and (population) variance over the time samples, merged
+    chunk by chunk with the parallel form of Welford's algorithm. Both are
+    NaN when no samples were seen.
+
+    `Chan, Golub & LeVeque (1979) <http://i.stanford.edu/pub/cstr/reports/cs/tr/79/773/CS-TR-79-773.pdf>`_
+    """
+
+    def reset(self):
+        self.count = 0
+        self.mean = 0.
+        self.m2 = 0.
+
+    def update(self, t, y):
+        count = len(y)
+        if not count:
+            # Only take the shape, for the NaN result
+            self.mean = self.mean + np.zeros(y.shape[1:])
+            self.m2 = self.m2 + np.zeros(y.shape[1:])
+            return
+        mean = y.mean(axis=0)
+        m2 = ((y - mean) ** 2).sum(axis=0)
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean = self.mean + delta * count / total
+        self.m2 = self.m2 + m2 + delta ** 2 * self.count * count / total
+        self.count = total
+
+    def result(self) -> dict:
+        if not self.count:
+            return {'mean': np.full(np.shape(self.mean), np.nan), 'variance': np.full(np.shape(self.m2), np.nan)}
+        return {'mean': self.mean, 'variance': self.m2 / self.count}
+
+
+class MinMax(Reduction):
+
+    """Extrema
+
+    Running minimum and maximum over the time samples.
+    """
+
+    def reset(self):
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, t, y):
+        self.min = np.minimum(self.min, y.min(axis=0))
+        self.max = np.maximum(self.max, y.max(axis=0))
+
+    def result(self) -> dict:
+        return {'min': self.min, 'max': self.max}
+
+
+class TimeAboveThreshold(Reduction):
+
+    """Time above threshold
+
+    Total time each component spends above threshold, counting each
+    interval of the time grid whose left sample is above it. threshold
+    may be a scalar or one value per component.
+    """
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+
+    def reset(self):
+        self.time = 0.
+        self.last = None
+
+    def update(self, t, y):
+        if self.last is not None:
+            t = np.concatenate(([self.last[0]], t))
+            y = np.concatenate((self.last[1][None], y))
+        above = y[:-1] > self.threshold
+        dt = np.diff(t).reshape((-1,) + (1,) * (y.ndim - 1))
+        self.time = self.time + (above * dt).sum(axis=0)
+        self.last = (t[-1], y[-1].copy())
+
+    def result(self) -> np.ndarray:
+        return self.time
+
+
+class Histogram(Reduction):
+
+    """Histogram
+
+    Fixed-bin histogram of the time samples of each component, with bins
+    evenly spaced over range. Samples outside range are not counted, as
+    in np.histogram. All counts are zero when no samples were seen.
+    """
+
+    def __init__(self, bins=50, range=(0., 1.)):
+        self.bins = bins
+        self.range = range
+
+    def reset(self):
+        self.counts = None
+        self.shape = ()
+
+    def update(self, t, y):
+        low, high = self.range
+        columns = y.reshape(len(y), int(np.prod(y.shape[1:])))
+        if self.counts is None:
+            self.counts = np.zeros((columns.shape[1], self.bins), dtype=np.int64)
+            self.shape = y.shape[1:]
+        index = np.floor((columns - low) / (high - low) * self.bins).astype(np.int64)
+        index[columns == high] = self.bins - 1
+        inside = (index >= 0) & (index < self.bins)
+        flat = (np.arange(columns.shape[1]) * self.bins + index)[inside]
+        self.counts += np.bincount(flat, minlength=self.counts.size).reshape(self.counts.shape)
+
+    def result(self) -> dict:
+        counts = np.zeros(self.shape + (self.bins,), dtype=np.int64) if self.counts is None else self.counts
+        return {'counts': counts.reshape(self.shape + (self.bins,)),
+                'edges': np.linspace(self.range[0], self.range[1], self.bins + 1)}
@@ -0,0 +1,93 @@
+import numpy as np
+
+
+class Solution(np.ndarray):
+
+    """Solution
+
+    Solved states, shaped [d, T], or [N, d, T] for a batch, as a view of
+    the array the solver wrote, so building one copies nothing. State
+    components are available by name, as views along the state axis, and
+    the time points as t, computed on first use:
+
+        solution = FitzhughNagumo().solve()
+        solution.v, solution['w'], solution.t
+
+    Anything else behaves as the underlying ndarray. Names and time axis
+    carry over to arrays of the same trailing [d, T] shape, e.g. one
+    trajectory of a batch or -solution. Indexing keeps the names when it
+    takes every state in order and slices time, e.g. solution[:, 100:],
+    and the time axis only when it takes every time point too, so
+    solution[::-1] or solution[[1, 0]] of a single solve drop both. Any
+    other slice or reduction is a plain array again in all but type.
+    """
+
+    def __new__(cls, arg1: np.ndarray, components: dict = None, final_time: float = None, time_steps: int = None):
+        solution = np.asanyarray(arg1).view(cls)
+        solution.components = {} if components is None else components
+        solution.final_time = final_time
+        solution.time_steps = time_steps
+        return solution
+
+    def __array_finalize__(self, obj):
+        keep = obj is not None and self.ndim >= 2 and np.shape(obj)[-2:] == self.shape[-2:]
+        self.components = getattr(obj, 'components', {}) if keep else {}
+        self.final_time = getattr(obj, 'final_time', None) if keep else None
+        self.time_steps = getattr(obj, 'time_steps', None) if keep else None
+        self.time = None
+
+    @property
+    def t(self) -> np.ndarray:
+        """Time points, the time_steps evenly spaced points from 0 to final_time."""
+        if self.time is None:
+            if self.time_steps is None:
+                raise ValueError('This array has no time axis, it is not a whole solution.')
+            self.time = np.linspace(0, self.final_time, self.time_steps)
+        return self.time
+
+    @property
+    def names(self) -> list:
+        return list(self.components)
+
+    def component(self, name: str) -> np.ndarray:
+        """View of state component name, shaped [T] or [N, T], or [k, T] or [N, k, T] for a block of states."""
+        if name not in self.components:
+            raise KeyError('No state component %r, expected one of %s.' % (name, self.names))
+        return self.view(np.ndarray)[..., self.components[name], :]
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.component(key)
+        result = super().__getitem__(key)
+        if isinstance(result, Solution) and self.components:
+            names, grid = self.whole_axes(key)
+            result.components = self.components if names else {}
+            if not grid:
+                result.final_time = result.time_steps = None
+        return result
+
+    def whole_axes(self, key) -> tuple:
+        """Whether indexing with key keeps the state names and the time grid.
+
+        Names need the whole state axis, in order, and a slice of the time
+        axis; the time grid also needs the whole time axis.
+
+        """
+        index = list(key) if isinstance(key, tuple) else [key]
+        # New axes and multidimensional masks shift the axes, give up on them
+        if any(entry is None or (np.ndim(entry) > 1 and np.asarray(entry).dtype == bool) for entry in index):
+            return False, False
+        ellipsis = [position for position, entry in enumerate(index) if entry is Ellipsis]
+        if ellipsis:
+            index[ellipsis[0]:ellipsis[0] + 1] = [slice(None)] * (self.ndim - len(index) + 1)
+        index += [slice(None)] * (self.ndim - len(index))
+        states, times = index[-2:]
+        whole = [isinstance(entry, slice) and entry.indices(size) == (0, size, 1)
+                 for entry, size in zip((states, times), self.shape[-2:])]
+        names = whole[0] and isinstance(times, slice)
+        return names, names and whole[1]
+
+    def __getattr__(self, name):
+        if name in self.__dict__.get('components', ()):
+            return self.component(name)
+        raise AttributeError('%r object has no attribute %r' % (type(self).__name__, name))
@@ -0,0 +1,209 @@
+import numpy as np
+
+from fizzpy.backends import NumpyOps
+from fizzpy.core import Model
+
+
+# Functions of the ops namespace the generated code may call
+FUNCTIONS = ['exp', 'log', 'sqrt', 'sin', 'cos', 'sinh', 'cosh', 'tanh']
+
+
+def printer(prefix: str):
+    """SymPy code printer calling prefix + name for the functions in FUNCTIONS, e.g. ops.exp."""
+    from sympy.printing.pycode import PythonCodePrinter
+
+    class Printer(PythonCodePrinter):
+
+        def _print_Pow(self, expr, rational=False):
+            return self._hprint_Pow(expr, rational=rational, sqrt=prefix + 'sqrt')
+
+    def print_function(self, expr, name):
+        return '%s%s(%s)' % (prefix, name, ', '.join(self._print(arg) for arg in expr.args))
+    for name in FUNCTIONS:
+        setattr(Printer, '_print_' + name, lambda self, expr, name=name: print_function(self, expr, name))
+    return Printer()
+
+
+def needed(outputs: list, replacements: list) -> list:
+    """The replacements outputs depend on, in order."""
+    symbols = set().union(*[expr.free_symbols for expr in outputs])
+    kept = []
+    for symbol, expr in reversed(replacements):
+        if symbol in symbols:
+            kept.append((symbol, expr))
+            symbols |= expr.free_symbols
+    return kept[::-1]
+
+
+class Generated:
+
+    """Generated code
+
+    Functions generated from the derivatives of a SymbolicModel, for one
+    state and parameter dimension:
+
+        constants(p, ops): the parameter-only subexpressions, as a list.
+        equations(state, t, p, ops, c): the derivatives, ops.stack-ed.
+        jacobian(state, t, p, ops, c): the exact Jacobian, ops.matrix-ed.
+        jit_equations(kernel, y, t, p, dy): the derivatives written into
+        dy, for the numba backend, with the constants following the
+        parameters in p.
+
+    Every parameter-only subexpression is hoisted into a constant, then
+    the subexpressions left are shared between the derivatives and the
+    Jacobian by common subexpression elimination.
+    """
+
+    def __init__(self, derivatives, dimension: int, parameters: int):
+        import sympy
+
+        self.state = sympy.symbols('y0:%d' % dimension)
+        self.p = sympy.symbols('p0:%d' % parameters)
+        t = sympy.Symbol('t')
+        f = [sympy.sympify(expr) for expr in derivatives(list(self.state), t, list(self.p))]
+        if len(f) != dimension:
+            raise ValueError('derivatives returned %d expressions for %d states.' % (len(f), dimension))
+        jacobian = list(sympy.Matrix(f).jacobian(self.state))
+
+        self.constants = {}
+        exprs = [self.hoist(expr) for expr in f + jacobian]
+        replacements, reduced = sympy.cse(exprs, symbols=sympy.numbered_symbols('s'))
+        f, jacobian = reduced[:dimension], reduced[dimension:]
+        self.c = list(self.constants.values())
+        constants = [(symbol, expr) for expr, symbol in self.constants.items()]
+
+        rows = [jacobian[row * dimension:(row + 1) * dimension] for row in range(dimension)]
+        self.source = '\n'.join([
+            self.function('constants', 'p, ops', constants, self.c,
+                          'return [%s]' % ', '.join(self.code(symbol) for symbol in self.c)),
+            self.function('equations', 'state, t, p, ops, c', needed(f, replacements), f,
+                          'return ops.stack([%s])' % ', '.join(self.vector(expr) for expr in f)),
+            self.function('jacobian', 'state, t, p, ops, c', needed(jacobian, replacements), jacobian,
+                          'return ops.matrix([%s])' % ', '.join(
+                              '[%s]' % ', '.join(self.code(expr) for expr in row) for row in rows)),
+            self.function('jit_equations', 'kernel, y, t, p, dy', needed(f, replacements), f,
+                          '\n    '.join('dy[%d] = %s' % (i, self.code(expr, 'math.')) for i, expr in enumerate(f)),
+                          'math.'),
+        ])
+        self.namespace = {'math': __import__('math')}
+        exec(compile(self.source, '<fizzpy.symbolic>', 'exec'), self.namespace)
+
+    def hoist(self, expr):
+        """Replace the parameter-only subexpressions of expr by constants."""
+        if expr.is_Atom:
+            return expr
+        if expr.free_symbols <= set(self.p):
+            return self.constant(expr)
+        if expr.is_Add or expr.is_Mul:
+            fixed = [arg for arg in expr.args if arg.free_symbols <= set(self.p)]
+            rest = [self.hoist(arg) for arg in expr.args if not arg.free_symbols <= set(self.p)]
+            combined = expr.func(*fixed)
+            return expr.func(combined if combined.is_Atom else self.constant(combined), *rest)
+        return expr.func(*[self.hoist(arg) for arg in expr.args])
+
+    def constant(self, expr):
+        import sympy
+
+        if expr not in self.constants:
+            self.constants[expr] = sympy.Symbol('c%d' % len(self.constants))
+        return self.constants[expr]
+
+    def code(self, expr, prefix: str = 'ops.') -> str:
+        return printer(prefix).doprint(expr)
+
+    def vector(self, expr) -> str:
+        """Code for a derivative, broadcast against the state when it does not depend on it."""
+        if expr.free_symbols & set(self.state):
+            return self.code(expr)
+        return '%s + 0 * state[0]' % self.code(expr)
+
+    def function(self, name: str, arguments: str, assignments: list, outputs: list, body: str,
+                 prefix: str = 'ops.') -> str:
+        """Source of one generated function, unpacking only the symbols it uses."""
+        used = set().union(*[expr.free_symbols for _, expr in assignments], *[expr.free_symbols for expr in outputs])
+        jit = name == 'jit_equations'
+        lines = ['%s = %s[%d]' % (symbol, 'y' if jit else 'state', i)
+                 for i, symbol in enumerate(self.state) if symbol in used]
+        lines += ['%s = p[%d]' % (symbol, i) for i, symbol in enumerate(self.p) if symbol in used]
+        lines += ['%s = %s' % (symbol, 'p[%d]' % (len(self.p) + i) if jit else 'c[%d]' % i)
+                  for i, symbol in enumerate(self.c) if symbol in used and name != 'constants']
+        lines += ['%s = %s' % (symbol, self.code(expr, prefix)) for symbol, expr in assignments]
+        return 'def %s(%s):\n    %s\n' % (name, arguments, '\n    '.join(lines + [body]))
+
+
+class SymbolicModel(Model):
+
+    """Symbolic model
+
+    Model declared once with SymPy. Subclasses define derivatives(state,
+    t, p), called with lists of SymPy symbols for the state and model
+    parameters, returning one expression per state:
+
+        class Lorenz(SymbolicModel):
+
+            def derivatives(self, state, t, p):
+                x, y, z = state
+                return [p[1] * (y - x), x * (p[0] - z) - y, x * y - p[2] * z]
+
+    The equations, their exact Jacobian and the compiled equations of the
+    numba backend are generated from the declaration the first time the
+    model is solved, shared by every instance of the class with the same
+    dimensions. Functions in the declaration must be SymPy functions,
+    e.g. sympy.exp.
+
+    `SymPy cse <https://docs.sympy.org/latest/modules/simplify/simplify.html#sympy.simplify.cse_main.cse>`_
+    """
+
+    generated = {}
+
+    def derivatives(self, state, t, p):
+        raise NotImplementedError
+
+    def init_converter(self, arg1):
+        """Initial conditions converter, always returns a new array so cached constants never go stale."""
+        return np.array(arg1, dtype=np.float64)
+
+    def code(self) -> Generated:
+        """The generated code for this model class and its dimensions."""
+        key = type(self), np.size(self.initial_conditions), np.size(self.model_parameters)
+        generated = SymbolicModel.generated.get(key)
+        if generated is None:
+            generated = Generated(self.derivatives, key[1], key[2])
+            SymbolicModel.generated[key] = generated
+        return generated
+
+    def bound(self, p, ops) -> list:
+        """The generated functions and the constants for p, computed once per parameter array solved with."""
+        cached = self.__dict__.get('cached_code')
+        if cached is None or cached[0] is not p:
+            functions = self.code().namespace
+            cached = p, functions, functions['constants'](p, ops)
+            self.cached_code = cached
+        return cached[1:]
+
+    def equations(self, state, t, p, ops):
+        functions, constants = self.bound(p, ops)
+        return functions['equations'](state, t, p, ops, constants)
+
+    def jacobian(self, state, t, p, ops):
+        functions, constants = self.bound(p, ops)
+        return functions['jacobian'](state, t, p, ops, constants)
+
+    def jit_equations(self, arg1: np.ndarray) -> list:
+        """Jit equations.
+
+        Parameters
+        ----------
+        arg1
+            Model parameters, shape [N, p].
+
+        Returns
+        -------
+        list
+            equations: scalar derivatives, called as (kernel, y, t, p, dy).
+            parameters: the parameters followed by the constants, [N, p + c].
+
+        """
+        code = self.code()
+        constants = [np.broadcast_to(c, len(arg1)) for c in code.namespace['constants'](arg1.T, NumpyOps)]
+        return [code.namespace['jit_equations'], np.column_stack([arg1] + constants)]
@@ -15,9 +15,14 @@ setuptools.setup(
     packages=setuptools.find_packages(),
     install_requires=[
         'numpy',
-        'tensorflow',
+        'scipy',
         'matplotlib',
     ],
+    extras_require={
+        'tensorflow': ['tensorflow'],
+        'jit': ['numba'],
+        'symbolic': ['sympy'],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: BSD+Patent",